@@ -0,0 +1,183 @@
+"""
+Rainbow Table Password Cracker - Engine Worker Pool
+Long-lived lookup engine processes shared by every request
+
+Each worker is started once and then answers batches of hashes over its stdin and
+stdout with the line protocol of rainbow_engine.worker, so requests pay neither for
+process startup nor for reloading tables. The default backend is the CPU engine.
+RAINBOW_ENGINE_CMD replaces it with any program speaking the same protocol, such as
+a GPU build. Workers start on first use, up to size of them; requests beyond that
+wait for one to become free. A worker that dies is replaced on the next request.
+"""
+
+import itertools
+import json
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+# Engine processes kept running; each one already spreads a batch over every core
+ENGINE_WORKERS = 2
+
+# Seconds a worker gets to exit after its stdin is closed
+SHUTDOWN_SECONDS = 5
+
+API_DIR = Path(__file__).parent
+
+class EngineError(RuntimeError):
+    """A worker failed or died while answering a request"""
+
+def engine_command():
+    """Command starting one worker: RAINBOW_ENGINE_CMD, or the CPU engine"""
+    command = os.environ.get("RAINBOW_ENGINE_CMD")
+    if command:
+        return shlex.split(command)
+    return [sys.executable, "-m", "rainbow_engine.worker"]
+
+class EngineWorker:
+    """One engine process and its protocol pipes"""
+
+    def __init__(self, cmd):
+        try:
+            self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            text=True, bufsize=1, cwd=API_DIR)
+        except OSError as e:
+            raise EngineError(f"cannot start engine {cmd[0]}: {e}") from e
+        try:
+            hello = self._read()
+            if not hello.get("ready"):
+                raise EngineError(f"engine did not start: {hello}")
+        except EngineError:
+            self.close()
+            raise
+        self.backend = hello.get("backend", "unknown")
+        self.pid = hello.get("pid", self.process.pid)
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def _read(self):
+        line = self.process.stdout.readline()
+        if not line:
+            raise EngineError(f"engine process exited with code {self.process.poll()}")
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise EngineError(f"engine wrote {line.strip()[:200]!r} instead of a protocol line")
+
+    def request(self, message):
+        """Send one request and wait for its response"""
+        try:
+            self.process.stdin.write(json.dumps(message) + "\n")
+            self.process.stdin.flush()
+            response = self._read()
+        except (OSError, ValueError) as e:
+            raise EngineError(f"engine process failed: {e}") from e
+        if response.get("id") != message["id"]:
+            raise EngineError(f"engine answered request {response.get('id')} "
+                              f"instead of {message['id']}")
+        return response
+
+    def close(self):
+        if self.process.stdin and not self.process.stdin.closed:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(SHUTDOWN_SECONDS)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+class EnginePool:
+    """Up to size engine workers, each serving one request at a time"""
+
+    def __init__(self, size=ENGINE_WORKERS, cmd=None):
+        self.size = size
+        self.cmd = cmd or engine_command()
+        self.requests = 0
+        self.retired = 0
+        self._ids = itertools.count(1)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._workers = []
+        self._closed = False
+
+    def _checkout(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if worker.alive:
+                    return worker
+                self._retire(worker)
+            worker = EngineWorker(self.cmd)
+            with self._lock:
+                self._workers.append(worker)
+            return worker
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _retire(self, worker):
+        worker.close()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self.retired += 1
+
+    def crack(self, table_path, hashes, algo=None):
+        """Crack a batch of hex hashes against a table file in one worker
+
+        Returns the worker's response: results, timings, stats and backend. Raises
+        ValueError for a request the engine rejects, EngineError if the worker fails.
+        """
+        if self._closed:
+            raise EngineError("engine pool is closed")
+        worker = self._checkout()
+        healthy = False
+        try:
+            message = {"id": next(self._ids), "table": str(table_path), "hashes": list(hashes),
+                       "algo": algo}
+            response = worker.request(message)
+            healthy = True
+        finally:
+            if healthy:
+                self._idle.put(worker)
+            else:
+                self._retire(worker)
+            self._slots.release()
+        with self._lock:
+            self.requests += 1
+        if "error" in response:
+            if response.get("invalid"):
+                raise ValueError(response["error"])
+            raise EngineError(response["error"])
+        return response
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "size": self.size,
+                "requests": self.requests,
+                "retired": self.retired,
+            }
+
+    def close(self):
+        """Stop every worker; requests after this fail"""
+        self._closed = True
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
@@ -0,0 +1,151 @@
+"""
+Rainbow Table Password Cracker - Generation Jobs
+Background table builds with progress snapshots for the API
+
+A job runs a checkpointed TableBuilder build in a small thread pool; the build itself
+spreads its chains over worker processes. Every progress report updates a snapshot
+(chains done, hashes per second over the last reports, ETA) and bumps a version
+number, so event streams only send something when there is something new.
+
+Cancelling a job discards its checkpoint. Stopping one, as the server does when it
+shuts down, keeps the checkpoint, so submitting the same build again resumes it.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from rainbow_engine import BuildCancelled
+
+# Builds running at once; each one already uses every core
+MAX_RUNNING_JOBS = 1
+
+# Progress reports the hash rate is averaged over
+RATE_WINDOW = 8
+
+class Job:
+    """One table build and its latest progress snapshot"""
+
+    def __init__(self, job_id, name, builder, on_done=None):
+        self.id = job_id
+        self.name = name
+        self.builder = builder
+        self.on_done = on_done
+        # queued, running, done, failed, cancelled or stopped
+        self.status = "queued"
+        self.error = None
+        self.done = 0
+        self.total = builder.num_chains
+        self.hash_rate = 0.0
+        self.eta = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.version = 0
+        self.cancel_event = threading.Event()
+        self.keep_checkpoint = False
+        self._samples = deque(maxlen=RATE_WINDOW)
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def _update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+
+    def report(self, done, total):
+        """TableBuilder progress callback"""
+        now = time.time()
+        self._samples.append((now, done))
+        first_time, first_done = self._samples[0]
+        chain_rate = (done - first_done) / (now - first_time) if now > first_time else 0.0
+        eta = (total - done) / chain_rate if chain_rate > 0 else None
+        self._update(done=done, total=total, eta=eta,
+                     hash_rate=chain_rate * self.builder.params["chain_len"])
+
+    def run(self):
+        # A job cancelled while queued was already marked by cancel()
+        if self.cancel_event.is_set():
+            return
+        self._update(status="running", started=time.time())
+        try:
+            self.builder.build(progress=self.report, cancel=self.cancel_event)
+            if self.on_done is not None:
+                self.on_done(self)
+        except BuildCancelled:
+            if self.keep_checkpoint:
+                self._update(status="stopped", finished=time.time())
+            else:
+                self.builder.discard()
+                self._update(status="cancelled", finished=time.time())
+            return
+        except Exception as e:
+            self._update(status="failed", error=str(e), finished=time.time())
+            return
+        self._update(status="done", eta=0.0, finished=time.time())
+
+    def cancel(self):
+        """Ask the job to stop and drop its checkpoint; a running build stops at its next batch"""
+        self._halt("cancelled")
+
+    def stop(self):
+        """Ask the job to stop, keeping its checkpoint for a later build to resume"""
+        self.keep_checkpoint = True
+        self._halt("stopped")
+
+    def _halt(self, status):
+        self.cancel_event.set()
+        if self.status == "queued":
+            self._update(status=status, finished=time.time())
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "table": self.name,
+                "status": self.status,
+                "error": self.error,
+                "chains_done": self.done,
+                "chains_total": self.total,
+                "progress": self.done / self.total if self.total else 1.0,
+                "hashes_per_second": self.hash_rate,
+                "eta_seconds": self.eta,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "version": self.version,
+            }
+
+class JobManager:
+    """Queue of generation jobs run by a thread pool"""
+
+    def __init__(self, max_running=MAX_RUNNING_JOBS):
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_running)
+
+    def submit(self, name, builder, on_done=None):
+        """Queue a build of table name; refuses a table another job is building"""
+        with self._lock:
+            if any(job.name == name and job.active for job in self.jobs.values()):
+                raise ValueError(f"a job is already building {name!r}")
+            job = Job(str(next(self._ids)), name, builder, on_done)
+            self.jobs[job.id] = job
+        self._pool.submit(job.run)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def shutdown(self):
+        """Stop every job, keeping the checkpoints of unfinished builds"""
+        for job in list(self.jobs.values()):
+            job.stop()
+        self._pool.shutdown(wait=True)
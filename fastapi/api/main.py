@@ -7,17 +7,44 @@ This exposes the original application functionality via API endpoints:
 2. /demo
 3. /test
 4. /plot
+5. /crack/batch, /crack/file, /crack/upload
+6. /metrics
+7. /crack, /ready
+8. /tables, /jobs/{id}, /jobs/{id}/events
+9. /crack/engine
 """
 
-from fastapi import FastAPI, Query
+import asyncio
+import functools
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse, JSONResponse
-import subprocess
 import sys
 import io
+import json
+import logging
+import tempfile
 import threading
+import time
+import numpy as np
 from pathlib import Path
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
-app = FastAPI(title="Rainbow Table Password Cracker API", version="1.0")
+from starlette.requests import ClientDisconnect
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load in the background so /ready can answer while large tables are mapped
+    threading.Thread(target=load_tables, daemon=True).start()
+    yield
+    JOBS.shutdown()
+    close_engine_pool()
+    for table in LOADED_TABLES.values():
+        table.close()
+    RESULT_CACHE.close()
+
+app = FastAPI(title="Rainbow Table Password Cracker API", version="1.0", lifespan=lifespan)
 origins = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
@@ -33,13 +60,84 @@ app.add_middleware(
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
-# Utility to stream subprocess output
-def stream_subprocess(cmd):
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-    for line in iter(process.stdout.readline, ''):
-        yield line
-    process.stdout.close()
-    process.wait()
+from rainbow_engine import (CHARSET, crack_batch, crack_digests, crack_hash_list, load_table,
+                            default_workers, HashListReader, LookupStats, RainbowTable,
+                            ResultCache, TableBuilder)
+from rainbow_engine.ingest import read_chunks
+from jobs import JobManager
+from engine_pool import EngineError
+from processes import ProcessLimiter
+from schema import BatchCrackRequest, HashFileRequest, HashRequest, TableJobRequest
+from utils import close_engine_pool, engine_pool, run_engine_batch
+
+# Hash list files and, under tables/, table files the API may open, by file name
+DATA_DIR = current_dir.parent / "data"
+TABLES_DIR = DATA_DIR / "tables"
+
+# Cracked passwords and per-table misses, shared with the GUI and kept across restarts
+RESULT_CACHE = ResultCache(str(DATA_DIR / "crack_cache.sqlite3"))
+
+# Tables of TABLES_DIR mapped once at startup, by file name
+LOADED_TABLES = {}
+LOAD_ERRORS = {}
+TABLES_READY = threading.Event()
+
+# Table generation jobs started through POST /tables
+JOBS = JobManager()
+
+# Values a table file header can hold for the parameters of POST /tables
+TABLE_FIELD_RANGES = {
+    "pwd_len": (1, 0xFFFF),
+    "chain_len": (1, 0xFFFFFFFF),
+    "table_index": (0, 0xFFFFFFFF),
+    "seed": (0, 0xFFFFFFFFFFFFFFFF),
+}
+
+# Seconds between progress checks of an event stream, and between keep-alive comments
+EVENT_POLL_SECONDS = 0.25
+EVENT_KEEPALIVE_SECONDS = 15
+
+# Child processes of /demo, /test and /plot
+PROCESSES = ProcessLimiter()
+
+logger = logging.getLogger(__name__)
+
+def table_files(directory):
+    """Finished table files of a directory, leaving out the parts of builds in progress"""
+    # An append builds its chains as NAME.append.rbt before merging them into NAME
+    return [path for path in sorted(directory.glob("*.rbt"))
+            if not path.name.endswith(".append.rbt")]
+
+def keep_table(name, table):
+    """Serve table under name, unless a job or the startup scan got there first"""
+    if LOADED_TABLES.setdefault(name, table) is not table:
+        table.close()
+
+def load_tables():
+    """Map every table file of TABLES_DIR and compute its identity for the cache
+
+    A file that cannot be loaded is recorded in LOAD_ERRORS and skipped; the tables
+    are reported ready whatever happens.
+    """
+    try:
+        for path in table_files(TABLES_DIR):
+            try:
+                table = load_table(str(path))
+                table.identity()
+                keep_table(path.name, table)
+            except Exception as e:
+                logger.exception("cannot load table %s", path)
+                LOAD_ERRORS[path.name] = str(e)
+    finally:
+        TABLES_READY.set()
+
+def stream_script(request, *args):
+    """Stream a script's output through PROCESSES, or 503 when too many are queued"""
+    stream = PROCESSES.open_stream([sys.executable, *args], request)
+    if stream is None:
+        return JSONResponse(status_code=503, headers={"Retry-After": "5"},
+                            content={"error": "too many scripts running, try again later"})
+    return StreamingResponse(stream, media_type="text/plain")
 
 @app.get("/gui")
 def gui_application():
@@ -54,39 +152,388 @@ def gui_application():
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @app.get("/demo")
-def command_line_demo():
+async def command_line_demo(request: Request):
     """
     Launch Command-Line Demo and stream output
     """
     try:
-        cmd = [sys.executable, "rainbow_crack_demo.py"]
-        return StreamingResponse(stream_subprocess(cmd), media_type="text/plain")
+        return stream_script(request, "rainbow_crack_demo.py")
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @app.get("/test")
-def quick_test():
+async def quick_test(request: Request):
     """
     Run Quick Verification Test and stream output
     """
     try:
-        cmd = [sys.executable, "test_rainbow.py"]
-        return StreamingResponse(stream_subprocess(cmd), media_type="text/plain")
+        return stream_script(request, "test_rainbow.py")
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @app.get("/plot")
-def plot_performance(time_ms: float = Query(2.5, description="CUDA lookup time in milliseconds")):
+async def plot_performance(request: Request,
+                           time_ms: float = Query(2.5, description="CUDA lookup time in milliseconds")):
     """
     Launch Performance Plot
     Accepts optional 'time_ms' parameter (default 2.5 ms)
     """
     try:
-        cmd = [sys.executable, "plot_performance.py", str(time_ms)]
-        return StreamingResponse(stream_subprocess(cmd), media_type="text/plain")
+        return stream_script(request, "plot_performance.py", str(time_ms))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+def data_file(directory, name):
+    """Path of a file directly inside directory, by its file name"""
+    path = directory / name
+    if Path(name).name != name or not path.is_file():
+        raise FileNotFoundError(f"no file named {name!r}")
+    return path
+
+def open_table(name):
+    """A table of TABLES_DIR by file name: the one loaded at startup, or else opened now"""
+    table = LOADED_TABLES.get(name)
+    if table is not None:
+        return table
+    return load_table(str(data_file(TABLES_DIR, name)))
+
+def release_table(table):
+    """Close a table from open_table unless it is one loaded at startup"""
+    if LOADED_TABLES.get(Path(table.path).name) is not table:
+        table.close()
+
+def result_line(target_hash, password, target_stats):
+    return json.dumps({"hash": target_hash, "password": password,
+                       "found": password is not None,
+                       "false_alarms": target_stats.false_alarms}) + "\n"
+
+def summary_line(count, cracked, stats, reader=None):
+    summary = {"done": True, "hashes": count, "cracked": cracked, "stats": stats.to_dict()}
+    if reader is not None:
+        summary.update(lines=reader.lines, invalid=reader.invalid,
+                       duplicates=reader.duplicates)
+    return json.dumps(summary) + "\n"
+
+def stream_batch(table, results, stats, reader=None):
+    """NDJSON line per cracked or missed hash, then a summary line"""
+    count = cracked = 0
+    try:
+        for target_hash, password, target_stats in results:
+            count += 1
+            cracked += password is not None
+            yield result_line(target_hash, password, target_stats)
+        yield summary_line(count, cracked, stats, reader)
+    finally:
+        results.close()
+        release_table(table)
+
+async def upload_batches(chunks, reader):
+    """Digest batches of an uploaded hash list, parsed as the chunks arrive"""
+    async for chunk in chunks:
+        for batch in await run_in_threadpool(reader.feed, chunk):
+            yield batch
+    for batch in reader.close():
+        yield batch
+
+async def spool_upload(chunks, reader):
+    """Parse an upload as it arrives into a temporary file of raw distinct digests"""
+    spool = tempfile.TemporaryFile()
+    try:
+        async for batch in upload_batches(chunks, reader):
+            spool.write(batch.tobytes())
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+def spooled_batches(spool, reader):
+    """Digest batches read back from an upload spool"""
+    while True:
+        data = spool.read(reader.batch_hashes * reader.digest_size)
+        if not data:
+            return
+        yield np.frombuffer(data, dtype=np.uint8).reshape(-1, reader.digest_size)
+
+def stream_upload(table, spool, reader):
+    """stream_batch for a spooled upload, one digest batch at a time"""
+    stats = LookupStats()
+    count = cracked = 0
+    try:
+        for batch in spooled_batches(spool, reader):
+            for target_hash, password, target_stats in crack_digests(table, batch, stats,
+                                                                     cache=RESULT_CACHE):
+                count += 1
+                cracked += password is not None
+                yield result_line(target_hash, password, target_stats)
+        yield summary_line(count, cracked, stats, reader)
+    finally:
+        spool.close()
+        release_table(table)
+
+@app.get("/ready")
+def readiness():
+    """
+    Readiness probe: 200 once the tables of the tables directory are loaded, 503 before
+    """
+    tables = {name: {"algo": table.algo, "pwd_len": table.pwd_len, "chain_len": table.chain_len,
+                     "chains": len(table)}
+              for name, table in list(LOADED_TABLES.items())}
+    ready = TABLES_READY.is_set()
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"ready": ready, "tables": tables, "errors": dict(LOAD_ERRORS)})
+
+@app.post("/crack")
+async def crack_hash(request: HashRequest):
+    """
+    Crack one hash in the API process against the tables loaded at startup and those
+    built since through POST /tables, which are added as their jobs finish
+    Without a table name, every loaded table for the hash's digest size (and algo) is tried.
+    Only the first of identical concurrent lookups searches, in a worker thread; the
+    others await its result without holding a thread.
+    """
+    if not TABLES_READY.is_set():
+        return JSONResponse(status_code=503, content={"error": "tables are still loading"})
+    target_hash = request.hash_value.strip().lower()
+    if request.table is not None:
+        if request.table not in LOADED_TABLES:
+            return JSONResponse(status_code=404, content={"error": f"no table named {request.table!r}"})
+        candidates = [(request.table, LOADED_TABLES[request.table])]
+    else:
+        candidates = [(name, table) for name, table in sorted(LOADED_TABLES.items())
+                      if (request.algo is None or table.algo == request.algo)
+                      and table.digest_size * 2 == len(target_hash)]
+        if not candidates:
+            return JSONResponse(status_code=404, content={"error": "no loaded table for this hash"})
+    stats = LookupStats()
+    start = time.perf_counter()
+    try:
+        for name, table in candidates:
+            table.target_digest(target_hash, request.algo)
+            password, found = await RESULT_CACHE.crack_async(
+                table, target_hash,
+                functools.partial(table.crack, target_hash, stats=stats, algo=request.algo),
+                stats, run_in_threadpool)
+            if found:
+                break
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return {
+        "hash": target_hash,
+        "password": password,
+        "found": found,
+        "table": name if found else None,
+        "algo": table.algo if found else request.algo,
+        "time_ms": (time.perf_counter() - start) * 1000,
+        "stats": stats.to_dict(),
+    }
+
+@app.post("/crack/batch")
+def crack_hash_batch(request: BatchCrackRequest):
+    """
+    Crack many hashes against one table and stream results as NDJSON
+    Duplicates are looked up once; results arrive in the order lookups finish
+    """
+    try:
+        table = open_table(request.table)
+    except FileNotFoundError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    stats = LookupStats()
+    try:
+        results = crack_batch(table, request.hashes, stats=stats, algo=request.algo,
+                              cache=RESULT_CACHE)
+    except ValueError as e:
+        release_table(table)
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return StreamingResponse(stream_batch(table, results, stats), media_type="application/x-ndjson")
+
+@app.post("/crack/engine")
+def crack_hash_engine(request: BatchCrackRequest):
+    """
+    Crack many hashes against one table in a pooled engine worker
+    Returns every result with the engine's timings; workers and their tables are
+    reused across requests. Hashes in the result cache, or being looked up by another
+    request, are not sent to the engine
+    """
+    try:
+        path = data_file(TABLES_DIR, request.table)
+    except FileNotFoundError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    try:
+        return run_engine_batch(request.hashes, path, request.algo, cache=RESULT_CACHE)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except EngineError as e:
+        return JSONResponse(status_code=502, content={"error": str(e)})
+
+@app.post("/crack/file")
+def crack_hash_file(request: HashFileRequest):
+    """
+    Crack a hash list file of the data directory, one hex hash per line
+    The file is read in chunks and looked up in bounded batches
+    """
+    try:
+        path = data_file(DATA_DIR, request.file)
+        table = open_table(request.table)
+    except FileNotFoundError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    stats = LookupStats()
+    reader = HashListReader(table.digest_size)
+    try:
+        results = crack_hash_list(table, read_chunks(path), reader, stats, request.algo,
+                                  cache=RESULT_CACHE)
+    except ValueError as e:
+        release_table(table)
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return StreamingResponse(stream_batch(table, results, stats, reader),
+                             media_type="application/x-ndjson")
+
+@app.post("/crack/upload")
+async def crack_hash_upload(request: Request, table: str = Query(..., description="Table file name"),
+                            algo: Optional[str] = Query(None, description="Algorithm of the hashes")):
+    """
+    Crack a hash list sent as the raw, possibly chunked, request body
+    The upload is parsed as it arrives into a spool of distinct digests; the body is
+    never held in memory whole. Results stream once the whole body has been read,
+    since a streaming response stops reading the request.
+    """
+    try:
+        lookup_table = open_table(table)
+    except FileNotFoundError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    try:
+        lookup_table.check_algorithm(algo)
+    except ValueError as e:
+        release_table(lookup_table)
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    reader = HashListReader(lookup_table.digest_size)
+    try:
+        spool = await spool_upload(request.stream(), reader)
+    except ClientDisconnect:
+        release_table(lookup_table)
+        return JSONResponse(status_code=400, content={"error": "upload interrupted"})
+    except BaseException:
+        release_table(lookup_table)
+        raise
+    return StreamingResponse(stream_upload(lookup_table, spool, reader),
+                             media_type="application/x-ndjson")
+
+@app.get("/metrics")
+def crack_metrics():
+    """
+    Result cache and request coalescing counters, and the script processes
+    "coalesced" counts lookups that waited for an identical lookup already running
+    """
+    return {**RESULT_CACHE.metrics(), "processes": PROCESSES.metrics(),
+            "engine": engine_pool().metrics()}
+
+def register_table(job):
+    """Serve a finished job's table like the ones loaded at startup, without a restart"""
+    table = load_table(str(TABLES_DIR / job.name))
+    table.identity()
+    keep_table(job.name, table)
+
+@app.post("/tables", status_code=202)
+def create_table(request: TableJobRequest):
+    """
+    Start a table generation job; returns its id right away
+    Progress is at /jobs/{id} and, as Server-Sent Events, /jobs/{id}/events. A build
+    stopped by a server shutdown resumes from its checkpoint when submitted again.
+    """
+    name = request.name
+    if Path(name).name != name or not name.endswith(".rbt"):
+        return JSONResponse(status_code=400, content={"error": "table names are file names ending in .rbt"})
+    if (TABLES_DIR / name).exists() or name in LOADED_TABLES:
+        return JSONResponse(status_code=409, content={"error": f"table {name!r} already exists"})
+    if request.chains <= 0:
+        return JSONResponse(status_code=400, content={"error": "chains must be positive"})
+    for field, (low, high) in TABLE_FIELD_RANGES.items():
+        value = getattr(request, field)
+        if value is not None and not low <= value <= high:
+            return JSONResponse(status_code=400,
+                                content={"error": f"{field} must be between {low} and {high}"})
+    if request.workers is not None and request.workers < 1:
+        return JSONResponse(status_code=400, content={"error": "workers must be positive"})
+    workers = min(request.workers or default_workers(), default_workers())
+    charset = request.charset or CHARSET
+    try:
+        # Check the parameters now rather than in the background job
+        RainbowTable(pwd_len=request.pwd_len, chain_len=request.chain_len, algo=request.algo,
+                     charset=charset, table_index=request.table_index,
+                     min_pwd_len=request.min_pwd_len)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    TABLES_DIR.mkdir(parents=True, exist_ok=True)
+    builder = TableBuilder(TABLES_DIR / name, request.chains, pwd_len=request.pwd_len,
+                           min_pwd_len=request.min_pwd_len, chain_len=request.chain_len,
+                           algo=request.algo, charset=charset, table_index=request.table_index,
+                           seed=request.seed, workers=workers)
+    try:
+        job = JOBS.submit(name, builder, on_done=register_table)
+    except ValueError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    return {"id": job.id, "status": f"/jobs/{job.id}", "events": f"/jobs/{job.id}/events"}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """
+    Status and progress of a table generation job
+    """
+    job = JOBS.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"no job {job_id}"})
+    return job.snapshot()
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """
+    Cancel a table generation job; a running build stops at its next batch
+    Its checkpoint is discarded, unlike a build stopped by a server shutdown
+    """
+    job = JOBS.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"no job {job_id}"})
+    job.cancel()
+    return JSONResponse(status_code=202, content=job.snapshot())
+
+async def job_events(job):
+    """SSE stream: a progress event per new snapshot, then one named after the outcome"""
+    version = None
+    idle = 0.0
+    while True:
+        snapshot = job.snapshot()
+        if snapshot["version"] != version:
+            version = snapshot["version"]
+            finished = snapshot["status"] not in ("queued", "running")
+            event = snapshot["status"] if finished else "progress"
+            yield f"event: {event}\ndata: {json.dumps(snapshot)}\n\n"
+            if finished:
+                return
+            idle = 0.0
+        elif idle >= EVENT_KEEPALIVE_SECONDS:
+            yield ": keep-alive\n\n"
+            idle = 0.0
+        await asyncio.sleep(EVENT_POLL_SECONDS)
+        idle += EVENT_POLL_SECONDS
+
+@app.get("/jobs/{job_id}/events")
+def job_event_stream(job_id: str):
+    """
+    Progress of a table generation job as Server-Sent Events
+    Events: progress (chains done, hashes/s, ETA), then done, failed, cancelled or stopped
+    """
+    job = JOBS.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"no job {job_id}"})
+    return StreamingResponse(job_events(job), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
 @app.get("/")
 def root():
     """
@@ -98,7 +545,17 @@ def root():
             "/gui": "Launch GUI Application",
             "/demo": "Command-Line Demo (streams progress)",
             "/test": "Quick Verification Test (streams output)",
-            "/plot?time_ms=2.5": "Performance Graph plot (optional time_ms parameter)"
+            "/plot?time_ms=2.5": "Performance Graph plot (optional time_ms parameter)",
+            "/crack/batch": "Batch hash cracking against a table file (POST, streams NDJSON)",
+            "/crack/file": "Crack a hash list file from the data directory (POST, streams NDJSON)",
+            "/crack/upload?table=NAME": "Crack an uploaded hash list (POST body, streams NDJSON)",
+            "/metrics": "Result cache and request coalescing counters",
+            "/crack": "Crack one hash against the loaded and job-built tables (POST)",
+            "/ready": "Readiness probe: 200 once the tables are loaded",
+            "/crack/engine": "Crack a batch of hashes in a pooled engine worker, with timings",
+            "/tables": "Start a table generation job (POST, returns a job id)",
+            "/jobs/{id}": "Job status (GET) or cancellation (DELETE)",
+            "/jobs/{id}/events": "Job progress as Server-Sent Events"
         }
     }
 
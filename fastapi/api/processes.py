@@ -0,0 +1,131 @@
+"""
+Rainbow Table Password Cracker - Child Process Streaming
+Script output streamed from asyncio subprocesses, a bounded number at a time
+
+The demo, test and plot endpoints each run a Python script and stream what it prints.
+Children run as asyncio subprocesses, so a stream waiting for output holds no worker
+thread. At most max_running children run at once; up to max_waiting more streams wait
+for a slot, and requests beyond that are turned away. Output is read in chunks of up
+to STREAM_CHUNK_BYTES and the next chunk is only read once the previous one was sent,
+so a slow client leaves the pipe full and pauses the child instead of buffering its
+output in the server. A child is killed as soon as its client disconnects.
+
+A stream takes its place in the queue when the request arrives (open_stream), not
+when the response starts, so a burst of requests cannot overfill the queue. Places
+and slots are given back before anything else is awaited on the way out, since a
+cancelled stream may not get to run another await.
+"""
+
+import asyncio
+import codecs
+import os
+import weakref
+
+import anyio
+
+# Scripts running at once
+MAX_RUNNING_CHILDREN = 2
+
+# Streams allowed to wait for a free slot
+MAX_WAITING_CHILDREN = 8
+
+# Largest chunk of output read and sent at once
+STREAM_CHUNK_BYTES = 1 << 16
+
+# Seconds between disconnect checks while a child prints nothing
+DISCONNECT_POLL_SECONDS = 1.0
+
+class _Place:
+    """A stream's place in the wait queue, given back exactly once"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.held = True
+        limiter.waiting += 1
+
+    def give_back(self):
+        if self.held:
+            self.held = False
+            self.limiter.waiting -= 1
+
+class ProcessLimiter:
+    """Semaphore plus bounded wait queue for child process streams"""
+
+    def __init__(self, max_running=MAX_RUNNING_CHILDREN, max_waiting=MAX_WAITING_CHILDREN):
+        self.max_running = max_running
+        self.max_waiting = max_waiting
+        self.running = 0
+        self.waiting = 0
+        self.killed = 0
+        self._slots = asyncio.Semaphore(max_running)
+
+    @property
+    def full(self):
+        """True when a new stream would have nowhere to wait"""
+        return self.running + self.waiting >= self.max_running + self.max_waiting
+
+    def open_stream(self, cmd, request=None):
+        """Queue cmd and return its output stream, or None when the queue is full
+
+        The place is held from now on; a stream that is never iterated gives it back
+        when it is garbage collected. request, the client's starlette Request, lets a
+        silent child be killed when the client goes away; a child that prints is
+        killed at the next chunk regardless.
+        """
+        if self.full:
+            return None
+        place = _Place(self)
+        stream = self._stream(cmd, request, place)
+        weakref.finalize(stream, place.give_back)
+        return stream
+
+    async def _stream(self, cmd, request, place):
+        try:
+            await self._slots.acquire()
+        finally:
+            place.give_back()
+        self.running += 1
+        process = None
+        try:
+            # Unbuffered so the script's output arrives as it prints
+            env = dict(os.environ, PYTHONUNBUFFERED="1")
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, env=env)
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(process.stdout.read(STREAM_CHUNK_BYTES),
+                                                   DISCONNECT_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    if request is not None and await request.is_disconnected():
+                        return
+                    continue
+                if not chunk:
+                    break
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+            await process.wait()
+        finally:
+            orphan = process is not None and process.returncode is None
+            if orphan:
+                process.kill()
+                self.killed += 1
+            self.running -= 1
+            self._slots.release()
+            if orphan:
+                # Reap it even when the stream was cancelled by the server
+                with anyio.CancelScope(shield=True):
+                    await process.wait()
+
+    def metrics(self):
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_running": self.max_running,
+            "max_waiting": self.max_waiting,
+            "killed": self.killed,
+        }
@@ -3,77 +3,65 @@ Rainbow Table Hash Cracker - Command Line Version
 Demonstrates cracking the test hash: ceb6c970658f31504a901b89dcd3e461 -> test@123
 """
 
-import hashlib
-import random
 import time
-import sys
+from pathlib import Path
 
-# Character set
-CHARSET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789@!#$%&*"
+from rainbow_engine import (CHARSET, LookupStats, TableBuilder, TableFormatError, default_workers,
+                            load_table)
 
-def hash_password(password):
-    """Generate MD5 hash"""
-    return hashlib.md5(password.encode()).hexdigest()
+# Built on the first run and reused afterwards; the API also serves it
+DEMO_TABLE = Path(__file__).resolve().parent.parent / "data" / "tables" / "demo.rbt"
 
-def reduce_hash(hash_value, step, pwd_len):
-    """Reduction function"""
-    num = int(hash_value[:16], 16) + step
-    base = len(CHARSET)
-    pwd = ""
-    for _ in range(pwd_len):
-        pwd += CHARSET[num % base]
-        num //= base
-    return pwd
+def open_demo_table(pwd_len, chain_len, num_chains):
+    """The saved demo table, or None if there is none with these parameters"""
+    try:
+        table = load_table(str(DEMO_TABLE))
+    except (OSError, TableFormatError):
+        return None
+    if (table.pwd_len, table.chain_len, table.algo, len(table)) != (pwd_len, chain_len, "md5",
+                                                                    num_chains):
+        table.close()
+        return None
+    return table
 
-def generate_chain(start_pwd, chain_len, pwd_len):
-    """Generate rainbow chain"""
-    pwd = start_pwd
-    for step in range(chain_len):
-        h = hash_password(pwd)
-        pwd = reduce_hash(h, step, pwd_len)
-    return hash_password(pwd)
-
-def crack_hash(target_hash, rainbow_table, chain_len, pwd_len):
-    """Crack hash using rainbow table"""
+def crack_hash(target_hash, table):
+    """Crack hash using rainbow table, reporting progress"""
     print(f"\n[*] Searching for hash: {target_hash}")
-    print(f"[*] Checking {len(rainbow_table)} chains...")
-    
-    # Check endpoints
-    if target_hash in rainbow_table.values():
-        print("[+] Found in endpoints!")
-        for start_pwd, end_hash in rainbow_table.items():
-            if end_hash == target_hash:
-                pwd = start_pwd
-                for step in range(chain_len):
-                    h = hash_password(pwd)
-                    if h == target_hash:
-                        return pwd, True
-                    pwd = reduce_hash(h, step, pwd_len)
-                return pwd, True
-    
-    # Check intermediate positions
-    print("[*] Checking intermediate positions...")
-    for pos in range(chain_len - 1, -1, -1):
-        if pos % 100 == 0:
-            print(f"[*] Checking position {pos}/{chain_len}")
-        
-        test_hash = target_hash
-        for step in range(pos, chain_len):
-            pwd = reduce_hash(test_hash, step, pwd_len)
-            test_hash = hash_password(pwd)
-        
-        if test_hash in rainbow_table.values():
-            print(f"[+] Found match at position {pos}!")
-            for start_pwd, end_hash in rainbow_table.items():
-                if end_hash == test_hash:
-                    pwd = start_pwd
-                    for step in range(chain_len):
-                        h = hash_password(pwd)
-                        if h == target_hash:
-                            return pwd, True
-                        pwd = reduce_hash(h, step, pwd_len)
-    
-    return None, False
+    print(f"[*] Checking {len(table)} chains...")
+    
+    def report(step):
+        if step == 0:
+            print("[*] Computing candidate endpoints for all positions...")
+        if step % 100 == 0:
+            print(f"[*] Candidate chains at step {step}/{table.chain_len}")
+    
+    stats = LookupStats()
+    password, success = table.crack(target_hash, progress=report, stats=stats)
+    if success:
+        print(f"[+] Match found at chain position {stats.position}!")
+    print(f"[*] Endpoint matches: {stats.endpoint_matches} ({stats.false_alarms} false alarms)")
+    print(f"[*] Hashes: {stats.candidate_hashes:,} candidate, {stats.verify_hashes:,} verification "
+          f"({stats.wasted_hashes:,} wasted)")
+    return password, success
+
+def generate_demo_table(builder):
+    """Build the demo table file, reporting progress, and open it"""
+    print(f"\n[GENERATION PHASE]")
+    print(f"Generating rainbow table with {builder.num_chains} chains...")
+    start_time = time.time()
+    
+    def report(done, total):
+        print(f"  Progress: {done}/{total} chains generated")
+    
+    builder.build(progress=report)
+    rainbow_table = load_table(str(DEMO_TABLE))
+    
+    gen_time = time.time() - start_time
+    hash_rate = rainbow_table.total_hashes / gen_time
+    print(f"  Generation Time: {gen_time:.2f} seconds")
+    print(f"  Hash Rate: {hash_rate:,.0f} hashes/second")
+    print(f"  Saved to {DEMO_TABLE} for later runs")
+    return rainbow_table
 
 def main():
     print("=" * 60)
@@ -84,38 +72,36 @@ def main():
     pwd_len = 8
     chain_len = 1000
     num_chains = 5000
+    workers = default_workers()
     
     print(f"\n[CONFIG]")
     print(f"  Password Length: {pwd_len}")
     print(f"  Chain Length: {chain_len}")
     print(f"  Number of Chains: {num_chains}")
     print(f"  Character Set: {len(CHARSET)} characters")
-    
-    # Generate rainbow table
-    print(f"\n[GENERATION PHASE]")
-    print(f"Generating rainbow table with {num_chains} chains...")
-    
-    rainbow_table = {}
-    start_time = time.time()
-    
-    for i in range(num_chains):
-        start_pwd = "".join(random.choice(CHARSET) for _ in range(pwd_len))
-        end_hash = generate_chain(start_pwd, chain_len, pwd_len)
-        rainbow_table[start_pwd] = end_hash
-        
-        if (i + 1) % 500 == 0:
-            print(f"  Progress: {i + 1}/{num_chains} chains generated")
-    
-    gen_time = time.time() - start_time
-    total_hashes = num_chains * chain_len
-    hash_rate = total_hashes / gen_time
+    print(f"  Worker Processes: {workers}")
+    
+    # Reuse the saved table, generating it only on the first run
+    generated = False
+    rainbow_table = open_demo_table(pwd_len, chain_len, num_chains)
+    if rainbow_table is None:
+        DEMO_TABLE.parent.mkdir(parents=True, exist_ok=True)
+        builder = TableBuilder(DEMO_TABLE, num_chains, pwd_len=pwd_len, chain_len=chain_len,
+                               algo="md5", workers=workers)
+        # Another run may be generating it right now: wait for it and reuse its table
+        with builder.lock:
+            rainbow_table = open_demo_table(pwd_len, chain_len, num_chains)
+            if rainbow_table is None:
+                rainbow_table = generate_demo_table(builder)
+                generated = True
+    if not generated:
+        print(f"\n[TABLE]")
+        print(f"Reusing saved rainbow table {DEMO_TABLE.name}")
     
     print(f"\n[STATISTICS]")
-    print(f"  Generation Time: {gen_time:.2f} seconds")
-    print(f"  Total Hashes Computed: {total_hashes:,}")
-    print(f"  Hash Rate: {hash_rate:,.0f} hashes/second")
+    print(f"  Total Hashes Computed: {rainbow_table.total_hashes:,}")
     print(f"  Table Size: {len(rainbow_table):,} endpoints")
-    print(f"  Memory Used: {sys.getsizeof(rainbow_table) / 1024:.2f} KB")
+    print(f"  Memory Used: {rainbow_table.nbytes / 1024:.2f} KB")
     
     # Test cracking
     print(f"\n[CRACKING PHASE]")
@@ -126,7 +112,7 @@ def main():
     print(f"Expected Password: {expected_pwd}")
     
     crack_start = time.time()
-    password, success = crack_hash(target_hash, rainbow_table, chain_len, pwd_len)
+    password, success = crack_hash(target_hash, rainbow_table)
     crack_time = time.time() - crack_start
     
     print(f"\n[RESULTS]")
@@ -147,19 +133,16 @@ def main():
     print("Testing with a password guaranteed to be in the table...")
     
     # Pick a random chain
-    test_start, test_end = list(rainbow_table.items())[0]
+    test_start = rainbow_table.start_point(rainbow_table.chain_ids[0])
     
     # Reconstruct to get a password in the middle
-    pwd = test_start
-    for step in range(chain_len // 2):
-        h = hash_password(pwd)
-        pwd = reduce_hash(h, step, pwd_len)
+    pwd = rainbow_table.password_at(test_start, chain_len // 2)
     
-    test_hash = hash_password(pwd)
+    test_hash = rainbow_table.hash(pwd)
     print(f"Test Hash: {test_hash}")
     print(f"Expected Password: {pwd}")
     
-    found_pwd, found = crack_hash(test_hash, rainbow_table, chain_len, pwd_len)
+    found_pwd, found = crack_hash(test_hash, rainbow_table)
     
     if found:
         print(f"\n  ✓ Validation PASSED")
@@ -167,6 +150,8 @@ def main():
     else:
         print(f"\n  ✗ Validation FAILED")
     
+    rainbow_table.close()
+    
     print("\n" + "=" * 60)
     print("DEMONSTRATION COMPLETE")
     print("=" * 60)
@@ -0,0 +1,57 @@
+"""
+Rainbow Table Engine
+Shared chain engine used by the GUI, the CLI demo, the test script and the API
+"""
+
+from .algorithms import (ALGORITHMS, HashAlgorithm, UnknownAlgorithmError, AlgorithmMismatchError,
+                         register_algorithm, get_algorithm)
+from .chain import CHARSET, hash_password, reduce_hash, generate_chain, walk_chain, search_chain
+from .table import ChainLookup, RainbowTable
+from .dp import DistinguishedPointTable
+from .storage import MappedTable, TableFormatError, TableWriter, save_table, load_table
+from .merge import merge_tables
+from .builder import TableBuilder, BuildCancelled, append_table
+from .tableset import TableSet
+from .batch_crack import crack_batch, crack_digests, crack_hash_list
+from .ingest import HashListReader
+from .cache import ResultCache
+from .coalesce import InflightLookups, LookupAbandoned
+from .parallel import default_workers
+from .stats import LookupStats
+
+__all__ = [
+    "ALGORITHMS",
+    "HashAlgorithm",
+    "UnknownAlgorithmError",
+    "AlgorithmMismatchError",
+    "register_algorithm",
+    "get_algorithm",
+    "CHARSET",
+    "hash_password",
+    "reduce_hash",
+    "generate_chain",
+    "walk_chain",
+    "search_chain",
+    "ChainLookup",
+    "RainbowTable",
+    "DistinguishedPointTable",
+    "MappedTable",
+    "TableFormatError",
+    "TableWriter",
+    "save_table",
+    "load_table",
+    "merge_tables",
+    "TableBuilder",
+    "BuildCancelled",
+    "append_table",
+    "TableSet",
+    "crack_batch",
+    "crack_digests",
+    "crack_hash_list",
+    "HashListReader",
+    "ResultCache",
+    "InflightLookups",
+    "LookupAbandoned",
+    "default_workers",
+    "LookupStats",
+]
@@ -0,0 +1,129 @@
+"""
+Rainbow Table Engine - Command Line
+Usage: python -m rainbow_engine build TABLE.rbt --chains 5000 [options]
+       python -m rainbow_engine append TABLE.rbt --chains 5000 [--workers N]
+       python -m rainbow_engine merge OUT.rbt IN1.rbt IN2.rbt ... [--perfect]
+       python -m rainbow_engine crack TABLE.rbt HASHES.txt [--algo md5]
+
+Re-running an interrupted build or append with the same arguments resumes it from its
+last checkpoint.
+"""
+
+import argparse
+import sys
+import time
+
+from .algorithms import ALGORITHMS
+from .batch_crack import crack_hash_list
+from .builder import TableBuilder, append_table
+from .chain import CHARSET
+from .ingest import DEFAULT_BATCH_HASHES, READ_CHUNK_BYTES, HashListReader, read_chunks
+from .merge import DEFAULT_BUFFER_CHAINS, merge_tables
+from .parallel import default_workers
+from .stats import LookupStats
+from .storage import load_table
+
+def _progress_printer():
+    start = time.time()
+    def report(done, total):
+        elapsed = time.time() - start
+        print(f"  Progress: {done}/{total} chains ({elapsed:.1f}s)", flush=True)
+    return report
+
+def build(args):
+    builder = TableBuilder(args.path, args.chains, pwd_len=args.pwd_len,
+                           min_pwd_len=args.min_pwd_len, chain_len=args.chain_len,
+                           algo=args.algo, charset=args.charset, table_index=args.table_index,
+                           seed=args.seed, workers=args.workers,
+                           checkpoint_chains=args.checkpoint_chains,
+                           buffer_chains=args.buffer_chains)
+    print(f"Building {args.path} ({args.chains} chains of length {args.chain_len})")
+    builder.build(progress=_progress_printer())
+    print(f"Table written to {args.path}")
+
+def append(args):
+    print(f"Appending {args.chains} chains to {args.path}")
+    append_table(args.path, args.chains, workers=args.workers,
+                 checkpoint_chains=args.checkpoint_chains, buffer_chains=args.buffer_chains,
+                 progress=_progress_printer())
+    print(f"Table written to {args.path}")
+
+def merge(args):
+    stats = merge_tables(args.inputs, args.path, args.buffer_chains, perfect=args.perfect)
+    print(f"Merged {stats['chains']} chains from {len(args.inputs)} tables into {args.path}: "
+          f"{stats['written']} written, {stats['dropped']} dropped")
+
+def crack(args):
+    if args.hashes == "-":
+        chunks = iter(lambda: sys.stdin.buffer.read(READ_CHUNK_BYTES), b"")
+    else:
+        chunks = read_chunks(args.hashes)
+    table = load_table(args.path)
+    try:
+        reader = HashListReader(table.digest_size, args.batch_hashes)
+        stats = LookupStats()
+        distinct = cracked = 0
+        # hash:password lines on stdout, the summary on stderr
+        for target_hash, password, _ in crack_hash_list(table, chunks, reader, stats,
+                                                        args.algo, args.workers):
+            distinct += 1
+            if password is not None:
+                cracked += 1
+                print(f"{target_hash}:{password}", flush=True)
+    finally:
+        table.close()
+    print(f"Cracked {cracked} of {distinct} distinct hashes from {reader.lines} lines "
+          f"({reader.invalid} invalid, {reader.duplicates} duplicates, "
+          f"{stats.false_alarms} false alarms)", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rainbow_engine")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("build", help="build a table file, resuming from its checkpoint")
+    p.add_argument("path")
+    p.add_argument("--chains", type=int, required=True)
+    p.add_argument("--pwd-len", type=int, default=8)
+    p.add_argument("--min-pwd-len", type=int,
+                   help="shortest password length (default: --pwd-len only)")
+    p.add_argument("--chain-len", type=int, default=1000)
+    p.add_argument("--algo", default="md5", choices=list(ALGORITHMS))
+    p.add_argument("--charset", default=CHARSET)
+    p.add_argument("--table-index", type=int, default=0)
+    p.add_argument("--seed", type=int)
+    p.add_argument("--workers", type=int, default=default_workers())
+    p.add_argument("--checkpoint-chains", type=int, default=65536)
+    p.add_argument("--buffer-chains", type=int, default=DEFAULT_BUFFER_CHAINS)
+    p.set_defaults(run=build)
+
+    p = commands.add_parser("append", help="add chains with new chain ids to a table file")
+    p.add_argument("path")
+    p.add_argument("--chains", type=int, required=True)
+    p.add_argument("--workers", type=int, default=default_workers())
+    p.add_argument("--checkpoint-chains", type=int, default=65536)
+    p.add_argument("--buffer-chains", type=int, default=DEFAULT_BUFFER_CHAINS)
+    p.set_defaults(run=append)
+
+    p = commands.add_parser("merge", help="merge tables with the same parameters and seed")
+    p.add_argument("path")
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("--perfect", action="store_true",
+                   help="keep only the lowest-id chain of every endpoint")
+    p.add_argument("--buffer-chains", type=int, default=DEFAULT_BUFFER_CHAINS)
+    p.set_defaults(run=merge)
+
+    p = commands.add_parser("crack", help="crack every hash of a hash list file")
+    p.add_argument("path")
+    p.add_argument("hashes", help="file with one hex hash per line, or - for stdin")
+    p.add_argument("--algo", choices=list(ALGORITHMS),
+                   help="algorithm of the hashes (default: the table's)")
+    p.add_argument("--workers", type=int, default=default_workers())
+    p.add_argument("--batch-hashes", type=int, default=DEFAULT_BATCH_HASHES)
+    p.set_defaults(run=crack)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Rainbow Table Engine - Hash Algorithms
+Registry of the hash functions tables can be built for
+
+Every algorithm provides new(data), a hashlib-style constructor whose objects have
+digest(), hexdigest() and digest_size, and optionally a batch kernel over rows of
+fixed-width passwords. Tables resolve their algorithm once, so the chain loop calls
+new directly and never sees the name. Unknown names raise instead of falling back.
+"""
+
+import hashlib
+import struct
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from .batch_hash import (MAX_BLOCK_INPUT, md4_batch, md5_batch, sha1_batch, ntlm_batch,
+                         double_md5_batch)
+
+# Algorithm names are stored in the 16-byte field of the table file header
+MAX_NAME_LEN = 16
+
+class UnknownAlgorithmError(ValueError):
+    """Raised for an algorithm name that is not registered"""
+
+class AlgorithmMismatchError(ValueError):
+    """Raised when a hash is looked up in a table built for another algorithm"""
+
+@dataclass(frozen=True)
+class HashAlgorithm:
+    name: str
+    new: Callable
+    batch: Optional[Callable] = None
+    max_batch_width: int = MAX_BLOCK_INPUT
+
+    @property
+    def digest_size(self):
+        return self.new().digest_size
+
+ALGORITHMS = {}
+
+def register_algorithm(name, new, batch=None, max_batch_width=MAX_BLOCK_INPUT):
+    """Make an algorithm available to tables under name"""
+    if not name.isascii() or not 0 < len(name) <= MAX_NAME_LEN:
+        raise ValueError(f"algorithm names are 1 to {MAX_NAME_LEN} ASCII characters")
+    algorithm = HashAlgorithm(name, new, batch, max_batch_width)
+    ALGORITHMS[name] = algorithm
+    return algorithm
+
+def get_algorithm(name):
+    try:
+        return ALGORITHMS[name]
+    except KeyError:
+        raise UnknownAlgorithmError(
+            f"unknown hash algorithm {name!r} (known: {', '.join(sorted(ALGORITHMS))})") from None
+
+def hash_function(name):
+    """hashlib-style constructor of a registered algorithm"""
+    return get_algorithm(name).new
+
+# ============ ALGORITHMS HASHLIB LACKS ============
+class DigestObject:
+    """hashlib-style object for an algorithm given as a one-shot digest function"""
+
+    def __init__(self, digest_fn, digest_size, data=b""):
+        self._digest_fn = digest_fn
+        self.digest_size = digest_size
+        self._data = bytes(data)
+
+    def update(self, data):
+        self._data += bytes(data)
+
+    def digest(self):
+        return self._digest_fn(self._data)
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+def digest_constructor(digest_fn, digest_size):
+    """Constructor new(data=b"") over a one-shot digest function"""
+    def new(data=b""):
+        return DigestObject(digest_fn, digest_size, data)
+    return new
+
+_MD4_ORDER = (list(range(16)) + [0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15]
+              + [0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15])
+_MD4_CONST = (0, 0x5A827999, 0x6ED9EBA1)
+_MD4_SHIFTS = ((3, 7, 11, 19), (3, 5, 9, 13), (3, 9, 11, 15))
+
+def _md4_digest(data):
+    """Pure-Python MD4 (RFC 1320) for OpenSSL builds without it"""
+    mask = 0xFFFFFFFF
+
+    def rotl(x, s):
+        return ((x << s) | (x >> (32 - s))) & mask
+
+    message = data + b"\x80" + b"\0" * ((55 - len(data)) % 64) + struct.pack("<Q", len(data) * 8)
+    h = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476]
+    for offset in range(0, len(message), 64):
+        x = struct.unpack_from("<16I", message, offset)
+        a, b, c, d = h
+        for i in range(48):
+            rnd = i // 16
+            if rnd == 0:
+                f = (b & c) | (~b & d)
+            elif rnd == 1:
+                f = (b & c) | (b & d) | (c & d)
+            else:
+                f = b ^ c ^ d
+            f = (a + f + x[_MD4_ORDER[i]] + _MD4_CONST[rnd]) & mask
+            a, b, c, d = d, rotl(f, _MD4_SHIFTS[rnd][i % 4]), b, c
+        h = [(v + w) & mask for v, w in zip(h, (a, b, c, d))]
+    return struct.pack("<4I", *h)
+
+try:
+    hashlib.new("md4")
+    def md4_digest(data):
+        return hashlib.new("md4", data).digest()
+except ValueError:
+    md4_digest = _md4_digest
+
+def ntlm_digest(data):
+    """NTLM hash: MD4 of the password as UTF-16LE"""
+    return md4_digest(bytes(data).decode("latin-1").encode("utf-16-le"))
+
+def double_md5_digest(data):
+    """md5(md5(password) as lowercase hex)"""
+    return hashlib.md5(hashlib.md5(data).hexdigest().encode("ascii")).digest()
+
+register_algorithm("md5", hashlib.md5, md5_batch)
+register_algorithm("sha1", hashlib.sha1, sha1_batch)
+register_algorithm("sha256", hashlib.sha256)
+register_algorithm("blake2b", hashlib.blake2b)
+register_algorithm("md4", digest_constructor(md4_digest, 16), md4_batch)
+register_algorithm("ntlm", digest_constructor(ntlm_digest, 16), ntlm_batch,
+                   max_batch_width=MAX_BLOCK_INPUT // 2)
+register_algorithm("double-md5", digest_constructor(double_md5_digest, 16), double_md5_batch)
+
+# ============ BATCH KERNEL SELECTION ============
+_verified = {}
+
+def _kernel_matches(algorithm, width):
+    rng = np.random.default_rng(width)
+    rows = rng.integers(0, 256, size=(64, width), dtype=np.uint8)
+    digests = algorithm.batch(rows)
+    return all(digests[i].tobytes() == algorithm.new(rows[i].tobytes()).digest()
+               for i in range(len(rows)))
+
+def batch_hash_function(algo, width, min_width=None):
+    """Batched kernel for algo over inputs of min_width..width bytes, or None if there is none
+
+    The first request for an (algo, width) pair checks the kernel against the
+    algorithm's single-hash function; a kernel that disagrees is never used.
+    """
+    algorithm = get_algorithm(algo)
+    min_width = width if min_width is None else min_width
+    if algorithm.batch is None or not 0 < min_width <= width <= algorithm.max_batch_width:
+        return None
+    for w in range(min_width, width + 1):
+        key = (algo, w)
+        if key not in _verified:
+            _verified[key] = _kernel_matches(algorithm, w)
+        if not _verified[key]:
+            return None
+    return algorithm.batch
@@ -0,0 +1,219 @@
+"""
+Rainbow Table Engine - Batch Lookup
+Cracking many hashes against one table with a single merged join
+
+A password dump is deduplicated, the candidate endpoints of every target are computed
+together in bulk and the whole candidate set is joined against the sorted endpoints
+in one ordered pass. Targets without an endpoint match are reported at once; the
+false-alarm checks of the others run in a thread pool and are reported as they finish.
+With a ResultCache, hashes already being looked up by another request are not searched
+again: the batch waits for that lookup instead.
+Hash lists too large to hold are streamed through a HashListReader batch by batch.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import threading
+
+import numpy as np
+
+from .coalesce import LookupAbandoned
+from .ingest import HashListReader
+from .parallel import default_workers
+from .stats import LookupStats
+from .vectorized import batch_candidate_endpoints, merge_join_endpoints
+
+# Upper bound on the candidate endpoints computed at once (targets x chain positions)
+BATCH_CANDIDATES = 1 << 20
+
+def _verify_target(table, target_hash, target, hits, stats):
+    """Check the endpoint matches of one target, from the chain end backwards"""
+    for pos, first, last in hits:
+        for chain_id in table.chain_ids[first:last]:
+            pwd = table.verify_at(chain_id, pos, target, stats)
+            if pwd is not None:
+                return target_hash, pwd, stats
+    return target_hash, None, stats
+
+def crack_batch(table, target_hashes, stats=None, algo=None, workers=None,
+                chunk_candidates=BATCH_CANDIDATES, cache=None):
+    """Crack many hex hashes against a table
+
+    Duplicates are looked up once. Every hash is checked before any work starts, so a
+    wrong algorithm or hash length raises here (see ChainLookup.target_digest).
+    Returns an iterator of (target_hash, password or None, LookupStats), one per
+    distinct lowercase hash, in the order the lookups finish. stats, a LookupStats,
+    collects the work of the whole batch as it is consumed. cache, a ResultCache,
+    answers the hashes it knows before the join and remembers the new results.
+    """
+    if hasattr(table, "dp_bits"):
+        raise TypeError("batch lookup needs a fixed chain length table")
+    unique = list(dict.fromkeys(h.strip().lower() for h in target_hashes))
+    digests = [table.target_digest(h, algo) for h in unique]
+    if stats is None:
+        stats = LookupStats()
+    return _crack_batch(table, unique, digests, stats, workers or default_workers(),
+                        max(1, chunk_candidates // (table.chain_len + 1)), cache)
+
+def crack_digests(table, digests, stats=None, workers=None, chunk_candidates=BATCH_CANDIDATES,
+                  cache=None):
+    """crack_batch for an (N, digest_size) uint8 array of distinct raw digests
+
+    Results name every target by its lowercase hex hash.
+    """
+    if hasattr(table, "dp_bits"):
+        raise TypeError("batch lookup needs a fixed chain length table")
+    if stats is None:
+        stats = LookupStats()
+    raw = [row.tobytes() for row in digests]
+    return _crack_batch(table, [d.hex() for d in raw], raw, stats, workers or default_workers(),
+                        max(1, chunk_candidates // (table.chain_len + 1)), cache)
+
+def crack_hash_list(table, chunks, reader=None, stats=None, algo=None, workers=None,
+                    cache=None):
+    """Crack a hex hash list given as byte chunks, one bounded batch at a time
+
+    reader, a HashListReader for the table digest size, parses the chunks and counts
+    invalid and duplicate lines; by default a new one is used. Yields what crack_batch
+    does, batch after batch.
+    """
+    table.check_algorithm(algo)
+    if reader is None:
+        reader = HashListReader(table.digest_size)
+    elif reader.digest_size != table.digest_size:
+        raise ValueError(f"reader parses {reader.digest_size}-byte digests, "
+                         f"{table.algo} has {table.digest_size}")
+    if stats is None:
+        stats = LookupStats()
+    return _crack_hash_list(table, reader.batches(chunks), stats, workers, cache)
+
+def _crack_hash_list(table, batches, stats, workers, cache):
+    for batch in batches:
+        yield from crack_digests(table, batch, stats, workers, cache=cache)
+
+def _crack_single(table, target_hash):
+    """Full lookup of one hash, for a hash whose coalesced lookup was abandoned"""
+    stats = LookupStats()
+    pwd, found = table.crack(target_hash, stats=stats)
+    return target_hash, pwd if found else None, stats
+
+def _crack_batch(table, hashes, digests, stats, workers, chunk, cache=None):
+    positions = table.chain_len + 1
+    candidate_hashes = table.chain_len * positions // 2
+    table_id = table.identity() if cache is not None else None
+    # Lookups this batch leads, and lookups of other requests it waits for
+    claimed = set()
+    claimed_lock = threading.Lock()
+    followers = {}
+
+    def publish(target_hash, pwd):
+        """Store a result and hand it to the requests waiting for it"""
+        if cache is None:
+            return
+        cache.put(table.algo, target_hash, table_id, pwd)
+        key = cache.inflight_key(table.algo, target_hash, table_id)
+        with claimed_lock:
+            if key not in claimed:
+                return
+            claimed.discard(key)
+        cache.inflight.resolve(key, (pwd, pwd is not None))
+
+    def published(future):
+        # Runs in the worker, so waiters are not held up by a slow consumer
+        if not future.cancelled() and future.exception() is None:
+            target_hash, pwd, _ = future.result()
+            publish(target_hash, pwd)
+
+    def finish(result, stored=False):
+        target_hash, pwd, target_stats = result
+        stats.merge(target_stats)
+        if not stored:
+            publish(target_hash, pwd)
+        return result
+
+    def settle(future):
+        name = followers.pop(future, None)
+        if name is None:
+            return finish(future.result(), stored=True)
+        try:
+            pwd, _ = future.result()
+        except LookupAbandoned:
+            # The leading request gave up; look the hash up here instead
+            retry = pool.submit(_crack_single, table, name)
+            retry.add_done_callback(published)
+            pending.add(retry)
+            return None
+        return finish((name, pwd, LookupStats(coalesced=1)), stored=True)
+
+    pending = set()
+    with ThreadPoolExecutor(workers) as pool:
+        try:
+            if cache is not None:
+                unknown = []
+                for name, digest in zip(hashes, digests):
+                    hit = cache.get(table.algo, name, table_id)
+                    if hit is not None:
+                        yield finish((name, hit[0], LookupStats(cache_hits=1)), stored=True)
+                        continue
+                    key = cache.inflight_key(table.algo, name, table_id)
+                    future, leader = cache.inflight.claim(key)
+                    if leader:
+                        claimed.add(key)
+                        unknown.append((name, digest))
+                    else:
+                        followers[future] = name
+                        pending.add(future)
+                hashes = [name for name, _ in unknown]
+                digests = [digest for _, digest in unknown]
+            for begin in range(0, len(hashes), chunk):
+                names = hashes[begin:begin + chunk]
+                targets = np.frombuffer(b"".join(digests[begin:begin + chunk]), dtype=np.uint8)
+                targets = targets.reshape(len(names), -1)
+                candidates = batch_candidate_endpoints(targets, table.chain_len, table._hash_fn,
+                                                       table._keyspace, None, table._batch_fn,
+                                                       table._salt)
+                rows, lo, hi = merge_join_endpoints(table.endpoints,
+                                                    candidates.reshape(-1, targets.shape[1]))
+
+                # Row p * T + t of the candidates is target t at chain position p
+                hits = [[] for _ in names]
+                for row, first, last in zip(rows, lo, hi):
+                    pos, t = divmod(int(row), len(names))
+                    hits[t].append((pos, first, last))
+                for t, name in enumerate(names):
+                    target_stats = LookupStats(candidate_hashes=candidate_hashes)
+                    if not hits[t]:
+                        yield finish((name, None, target_stats))
+                        continue
+                    hits[t].sort(reverse=True)
+                    check = pool.submit(_verify_target, table, name, digests[begin + t],
+                                        hits[t], target_stats)
+                    check.add_done_callback(published)
+                    pending.add(check)
+
+                # Report the lookups that finished while this chunk was computed
+                done = {future for future in pending if future.done()}
+                pending -= done
+                for future in done:
+                    result = settle(future)
+                    if result is not None:
+                        yield result
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = settle(future)
+                    if result is not None:
+                        yield result
+        finally:
+            # A consumer that stops early leaves no queued checks behind, and hands the
+            # lookups it led back to the requests waiting for them
+            for future in pending:
+                if future not in followers:
+                    future.cancel()
+            if cache is not None:
+                with claimed_lock:
+                    abandoned = list(claimed)
+                    claimed.clear()
+                for key in abandoned:
+                    cache.inflight.abandon(key)
+                cache.flush()
@@ -0,0 +1,161 @@
+"""
+Rainbow Table Engine - Batched Hash Kernels
+Multi-buffer MD5, SHA-1 and MD4 over numpy uint32 arrays
+
+Every candidate in a table has the same length, so N candidates fit N single padded
+blocks that run through identical rounds in lockstep, one numpy operation per round
+step for the whole batch. This is the CPU counterpart of cuda_core/src/hash_md5.cu.
+Kernels are only used after they reproduce the single-hash function of their
+algorithm on a probe batch (see algorithms.batch_hash_function).
+"""
+
+import math
+
+import numpy as np
+
+# Longest input that still fits one 64-byte block with padding and length
+MAX_BLOCK_INPUT = 55
+
+def _pad_block(rows):
+    """Pad fixed-width rows into one 64-byte MD4/MD5/SHA-1 block each"""
+    count, width = rows.shape
+    block = np.zeros((count, 64), dtype=np.uint8)
+    block[:, :width] = rows
+    block[:, width] = 0x80
+    return block
+
+def _rotl(x, s):
+    return (x << np.uint32(s)) | (x >> np.uint32(32 - s))
+
+# ============ MD5 ============
+_MD5_K = [np.uint32(int(abs(math.sin(i + 1)) * 2 ** 32) & 0xFFFFFFFF) for i in range(64)]
+_MD5_S = [7, 12, 17, 22] * 4 + [5, 9, 14, 20] * 4 + [4, 11, 16, 23] * 4 + [6, 10, 15, 21] * 4
+_MD5_G = ([i for i in range(16)] + [(5 * i + 1) % 16 for i in range(16, 32)]
+          + [(3 * i + 5) % 16 for i in range(32, 48)] + [(7 * i) % 16 for i in range(48, 64)])
+_MD5_INIT = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476)
+
+def md5_batch(rows):
+    """MD5 of every row of an (N, width) uint8 array, width <= 55; returns (N, 16) uint8"""
+    count, width = rows.shape
+    block = _pad_block(rows)
+    block[:, 56:64] = np.frombuffer((width * 8).to_bytes(8, "little"), dtype=np.uint8)
+    words = block.view("<u4").astype(np.uint32)
+    M = [words[:, g] for g in range(16)]
+    # Words past the padding byte are zero for every row and can be skipped
+    zero = [g * 4 > width and g < 14 for g in range(16)]
+
+    a, b, c, d = (np.full(count, v, dtype=np.uint32) for v in _MD5_INIT)
+    for i in range(64):
+        if i < 16:
+            f = (b & c) | (~b & d)
+        elif i < 32:
+            f = (d & b) | (~d & c)
+        elif i < 48:
+            f = b ^ c ^ d
+        else:
+            f = c ^ (b | ~d)
+        f += a
+        f += _MD5_K[i]
+        g = _MD5_G[i]
+        if not zero[g]:
+            f += M[g]
+        a, d, c = d, c, b
+        b = b + _rotl(f, _MD5_S[i])
+
+    out = np.empty((count, 4), dtype="<u4")
+    for j, (v, init) in enumerate(zip((a, b, c, d), _MD5_INIT)):
+        out[:, j] = v + np.uint32(init)
+    return out.view(np.uint8).reshape(count, 16)
+
+# ============ SHA-1 ============
+_SHA1_INIT = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0)
+_SHA1_K = (np.uint32(0x5A827999), np.uint32(0x6ED9EBA1), np.uint32(0x8F1BBCDC), np.uint32(0xCA62C1D6))
+
+def sha1_batch(rows):
+    """SHA-1 of every row of an (N, width) uint8 array, width <= 55; returns (N, 20) uint8"""
+    count, width = rows.shape
+    block = _pad_block(rows)
+    block[:, 56:64] = np.frombuffer((width * 8).to_bytes(8, "big"), dtype=np.uint8)
+    words = block.view(">u4").astype(np.uint32)
+    W = [words[:, t] for t in range(16)]
+    for t in range(16, 80):
+        W.append(_rotl(W[t - 3] ^ W[t - 8] ^ W[t - 14] ^ W[t - 16], 1))
+
+    a, b, c, d, e = (np.full(count, v, dtype=np.uint32) for v in _SHA1_INIT)
+    for t in range(80):
+        if t < 20:
+            f = (b & c) | (~b & d)
+        elif t < 40:
+            f = b ^ c ^ d
+        elif t < 60:
+            f = (b & c) | (b & d) | (c & d)
+        else:
+            f = b ^ c ^ d
+        temp = _rotl(a, 5) + f
+        temp += e
+        temp += _SHA1_K[t // 20]
+        temp += W[t]
+        a, b, c, d, e = temp, a, _rotl(b, 30), c, d
+
+    out = np.empty((count, 5), dtype=">u4")
+    for j, (v, init) in enumerate(zip((a, b, c, d, e), _SHA1_INIT)):
+        out[:, j] = v + np.uint32(init)
+    return out.view(np.uint8).reshape(count, 20)
+
+# ============ MD4 ============
+_MD4_INIT = _MD5_INIT
+_MD4_ROUNDS = (
+    (np.uint32(0), list(range(16)), (3, 7, 11, 19)),
+    (np.uint32(0x5A827999), [0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15], (3, 5, 9, 13)),
+    (np.uint32(0x6ED9EBA1), [0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15], (3, 9, 11, 15)),
+)
+
+def md4_batch(rows):
+    """MD4 of every row of an (N, width) uint8 array, width <= 55; returns (N, 16) uint8"""
+    count, width = rows.shape
+    block = _pad_block(rows)
+    block[:, 56:64] = np.frombuffer((width * 8).to_bytes(8, "little"), dtype=np.uint8)
+    words = block.view("<u4").astype(np.uint32)
+    X = [words[:, k] for k in range(16)]
+
+    state = [np.full(count, v, dtype=np.uint32) for v in _MD4_INIT]
+    for rnd, (const, order, shifts) in enumerate(_MD4_ROUNDS):
+        for i, k in enumerate(order):
+            a, b, c, d = state
+            if rnd == 0:
+                f = (b & c) | (~b & d)
+            elif rnd == 1:
+                f = (b & c) | (b & d) | (c & d)
+            else:
+                f = b ^ c ^ d
+            f += a
+            f += X[k]
+            if const:
+                f += const
+            # The next step of the reference updates d from (a', b, c)
+            state = [d, _rotl(f, shifts[i % 4]), b, c]
+
+    out = np.empty((count, 4), dtype="<u4")
+    for j, (v, init) in enumerate(zip(state, _MD4_INIT)):
+        out[:, j] = v + np.uint32(init)
+    return out.view(np.uint8).reshape(count, 16)
+
+# ============ COMPOSITES ============
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+def hex_rows(digests):
+    """Lowercase hex encoding of every digest row, as ASCII rows twice as wide"""
+    out = np.empty((len(digests), digests.shape[1] * 2), dtype=np.uint8)
+    out[:, 0::2] = _HEX_DIGITS[digests >> 4]
+    out[:, 1::2] = _HEX_DIGITS[digests & 15]
+    return out
+
+def ntlm_batch(rows):
+    """NTLM (MD4 of the UTF-16LE password) of every ASCII row, width <= 27"""
+    wide = np.zeros((len(rows), rows.shape[1] * 2), dtype=np.uint8)
+    wide[:, 0::2] = rows
+    return md4_batch(wide)
+
+def double_md5_batch(rows):
+    """md5(md5(password) as hex) of every row, width <= 55"""
+    return md5_batch(hex_rows(md5_batch(rows)))
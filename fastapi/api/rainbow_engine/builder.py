@@ -0,0 +1,249 @@
+"""
+Rainbow Table Engine - Checkpointed Builds
+Long table builds that survive crashes and restarts
+
+A build of path writes its progress to path + ".build/": every checkpoint_chains chains
+are sorted and saved as a run (itself a valid table file) and the chain-index range is
+recorded in manifest.json. Re-running the same build resumes after the last completed
+range. The final table is a k-way merge of the runs, so it is byte-identical to an
+uninterrupted build, and memory stays bounded by checkpoint_chains while generating
+and by buffer_chains while merging, whatever the table size.
+
+append_table grows an existing table file the same way: it builds the next chain-id
+range as a resumable build of its own and merges it into the table.
+
+Only one build of a path runs at a time: a build holds an OS lock on path + ".lock"
+and any other build of the same path waits for it. The OS drops the lock when its
+holder exits, so a crashed build never leaves the path locked.
+"""
+
+import json
+import os
+import random
+import shutil
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+
+from .chain import CHARSET
+from .merge import DEFAULT_BUFFER_CHAINS, merge_tables
+from .storage import save_table, load_table
+from .table import RainbowTable, CHAIN_ID_DTYPE
+
+MANIFEST = "manifest.json"
+
+# Seconds between attempts to take the lock of a path another build holds
+LOCK_POLL_SECONDS = 0.5
+
+class BuildCancelled(Exception):
+    """Raised by a build stopped through its cancel event; its checkpoint is kept"""
+
+def _try_lock(f):
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class BuildLock:
+    """Exclusive, re-entrant lock on building one table file"""
+
+    def __init__(self, path):
+        self.path = str(path) + ".lock"
+        self._file = None
+        self._depth = 0
+
+    def acquire(self, cancel=None):
+        """Wait until no other build holds the lock; cancel stops the wait"""
+        if self._depth:
+            self._depth += 1
+            return
+        f = open(self.path, "a+b")
+        while not _try_lock(f):
+            if cancel is not None and cancel.is_set():
+                f.close()
+                raise BuildCancelled(self.path)
+            time.sleep(LOCK_POLL_SECONDS)
+        self._file = f
+        self._depth = 1
+
+    def release(self):
+        self._depth -= 1
+        if not self._depth:
+            _unlock(self._file)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+def _write_atomic(path, write):
+    """Write through a temporary file so a crash never leaves a partial file at path"""
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+class TableBuilder:
+    """Resumable build of a rainbow table file"""
+
+    def __init__(self, path, num_chains, pwd_len=8, chain_len=1000, algo="md5", charset=CHARSET,
+                 table_index=0, seed=None, workers=1, batch_size=4096, checkpoint_chains=65536,
+                 buffer_chains=DEFAULT_BUFFER_CHAINS, first_chain=0, min_pwd_len=None):
+        self.path = str(path)
+        self.num_chains = num_chains
+        self.first_chain = first_chain
+        self.params = {
+            "pwd_len": pwd_len,
+            "min_pwd_len": pwd_len if min_pwd_len is None else min_pwd_len,
+            "chain_len": chain_len,
+            "algo": algo,
+            "charset": charset,
+            "table_index": table_index,
+        }
+        self.seed = seed
+        self.workers = workers
+        self.batch_size = batch_size
+        self.checkpoint_chains = checkpoint_chains
+        self.buffer_chains = buffer_chains
+        self.lock = BuildLock(self.path)
+
+    @property
+    def build_dir(self):
+        return self.path + ".build"
+
+    def _manifest_path(self):
+        return os.path.join(self.build_dir, MANIFEST)
+
+    def _load_manifest(self):
+        """Existing checkpoint state, or a fresh one"""
+        try:
+            with open(self._manifest_path()) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            seed = self.seed if self.seed is not None else random.getrandbits(64)
+            return {"params": self.params, "first_chain": self.first_chain,
+                    "num_chains": self.num_chains, "seed": seed, "completed": [], "runs": []}
+        if (manifest["params"] != self.params or manifest["num_chains"] != self.num_chains
+                or manifest.get("first_chain", 0) != self.first_chain):
+            raise ValueError(f"{self.build_dir} holds a checkpoint for different table parameters")
+        if self.seed is not None and manifest["seed"] != self.seed:
+            raise ValueError(f"{self.build_dir} holds a checkpoint for a different seed")
+        return manifest
+
+    def _save_manifest(self, manifest):
+        def write(tmp):
+            with open(tmp, "w") as f:
+                json.dump(manifest, f)
+        _write_atomic(self._manifest_path(), write)
+
+    def _new_table(self, seed):
+        table = RainbowTable(**self.params)
+        table.seed = seed
+        return table
+
+    def discard(self):
+        """Drop the checkpoint of an unfinished build, so the next build starts over"""
+        shutil.rmtree(self.build_dir, ignore_errors=True)
+
+    def build(self, progress=None, cancel=None):
+        """Build (or resume building) the table file and return its path
+
+        progress, when given, is called as progress(done, num_chains) after every batch,
+        counting chains restored from the checkpoint. cancel, a threading.Event, stops
+        the build with BuildCancelled at the next batch once it is set. A build of the
+        same path in progress elsewhere is waited for first; hold self.lock around
+        build() to check for its result before building again.
+        """
+        self.lock.acquire(cancel)
+        try:
+            return self._build(progress, cancel)
+        finally:
+            self.lock.release()
+
+    def _build(self, progress, cancel):
+        os.makedirs(self.build_dir, exist_ok=True)
+        manifest = self._load_manifest()
+        self._save_manifest(manifest)
+        done = sum(stop - start for start, stop in manifest["completed"])
+        next_start = manifest["completed"][-1][1] if manifest["completed"] else self.first_chain
+        last = self.first_chain + self.num_chains
+        if progress:
+            progress(done, self.num_chains)
+
+        def report(count):
+            nonlocal done
+            done += count
+            if progress:
+                progress(done, self.num_chains)
+            if cancel is not None and cancel.is_set():
+                raise BuildCancelled(self.path)
+
+        while next_start < last:
+            stop = min(next_start + self.checkpoint_chains, last)
+            run = self._new_table(manifest["seed"])
+            endpoints = run.generate_range(next_start, stop, self.workers, self.batch_size, report)
+            run.set_chains(endpoints, np.arange(next_start, stop, dtype=CHAIN_ID_DTYPE))
+            name = f"run-{next_start:012d}.rbt"
+            _write_atomic(os.path.join(self.build_dir, name), lambda tmp: save_table(run, tmp))
+            manifest["completed"].append([next_start, stop])
+            manifest["runs"].append(name)
+            self._save_manifest(manifest)
+            next_start = stop
+
+        self._finish(manifest)
+        return self.path
+
+    def _finish(self, manifest):
+        """Merge the sorted runs into the final table and drop the checkpoint"""
+        runs = [os.path.join(self.build_dir, name) for name in manifest["runs"]]
+        if runs:
+            _write_atomic(self.path, lambda tmp: merge_tables(runs, tmp, self.buffer_chains))
+        else:
+            _write_atomic(self.path, lambda tmp: save_table(self._new_table(manifest["seed"]), tmp))
+        shutil.rmtree(self.build_dir)
+
+def append_table(path, num_chains, workers=1, batch_size=4096, checkpoint_chains=65536,
+                 buffer_chains=DEFAULT_BUFFER_CHAINS, progress=None):
+    """Grow a table file by num_chains chains with the next unused chain ids
+
+    Re-running an interrupted append resumes it. Returns the path. A table missing
+    some chain ids, such as a perfect one, is refused with ValueError: the file does
+    not record which ids were tried and dropped, so new chains could neither take
+    untried ids nor be kept off its endpoints.
+    """
+    path = str(path)
+    with load_table(path) as table:
+        params = {name: getattr(table, name)
+                  for name in ("pwd_len", "min_pwd_len", "chain_len", "algo", "charset",
+                               "table_index")}
+        seed = table.seed
+        first = table.next_chain_id()
+        if first != len(table):
+            raise ValueError(f"{path} is missing chain ids (a perfect table?); "
+                             f"it cannot be appended to, rebuild it at the larger size")
+    addition = path + ".append.rbt"
+    TableBuilder(addition, num_chains, seed=seed, workers=workers, batch_size=batch_size,
+                 checkpoint_chains=checkpoint_chains, buffer_chains=buffer_chains,
+                 first_chain=first, **params).build(progress)
+    _write_atomic(path, lambda tmp: merge_tables([path, addition], tmp, buffer_chains))
+    os.remove(addition)
+    return path
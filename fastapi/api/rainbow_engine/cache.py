@@ -0,0 +1,256 @@
+"""
+Rainbow Table Engine - Result Cache
+Cracked passwords and confirmed misses, remembered across lookups and restarts
+
+A cracked hash stays cracked whatever table found it, so positive entries are keyed by
+(algorithm, hash) alone. A miss only holds for the table that missed it: negative
+entries are keyed by the table identity as well, a digest of the table parameters and
+chains, so they stop applying as soon as the table is regenerated or appended to.
+Entries live in a bounded in-memory LRU in front of an optional sqlite file. Lookups
+that miss the cache while the same lookup is already running wait for its result
+(see InflightLookups).
+"""
+
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from .coalesce import InflightLookups, LookupAbandoned
+
+# Entries kept in memory
+DEFAULT_CACHE_ENTRIES = 1 << 16
+
+# Writes to the cache file are committed in groups of this many
+COMMIT_EVERY = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cracked (
+    algo TEXT NOT NULL, hash TEXT NOT NULL, password TEXT NOT NULL,
+    PRIMARY KEY (algo, hash)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS misses (
+    algo TEXT NOT NULL, hash TEXT NOT NULL, table_id TEXT NOT NULL,
+    PRIMARY KEY (algo, hash, table_id)
+) WITHOUT ROWID;
+"""
+
+class ResultCache:
+    """hash -> password and (hash, table) -> miss cache with an LRU and a sqlite tier
+
+    path names the cache file; None keeps the cache in memory only. Safe to share
+    between threads.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._db = None
+        self.inflight = InflightLookups()
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+
+    def _keep(self, key, password):
+        self._entries[key] = password
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, algo, target_hash, table_id=None):
+        """(password, found) remembered for a hash, or None if nothing is known
+
+        A cracked password is returned for any table; a miss only for table_id.
+        """
+        with self._lock:
+            cached = self._get(algo, target_hash.lower(), table_id)
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return cached
+
+    def _get(self, algo, target_hash, table_id):
+        for key in ((algo, target_hash, None), (algo, target_hash, table_id)):
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                password = self._entries[key]
+                return password, password is not None
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT password FROM cracked WHERE algo = ? AND hash = ?",
+                               (algo, target_hash)).fetchone()
+        if row is not None:
+            self._keep((algo, target_hash, None), row[0])
+            return row[0], True
+        if table_id is not None and self._db.execute(
+                "SELECT 1 FROM misses WHERE algo = ? AND hash = ? AND table_id = ?",
+                (algo, target_hash, table_id)).fetchone():
+            self._keep((algo, target_hash, table_id), None)
+            return None, False
+        return None
+
+    def put(self, algo, target_hash, table_id, password):
+        """Remember a lookup result; password None records a miss of table table_id"""
+        target_hash = target_hash.lower()
+        if password is None:
+            if table_id is None:
+                raise ValueError("a miss must name the table that missed")
+            key = (algo, target_hash, table_id)
+        else:
+            key = (algo, target_hash, None)
+        with self._lock:
+            self._keep(key, password)
+            if self._db is None:
+                return
+            if password is None:
+                self._db.execute("INSERT OR IGNORE INTO misses VALUES (?, ?, ?)",
+                                 (algo, target_hash, table_id))
+            else:
+                self._db.execute("INSERT OR REPLACE INTO cracked VALUES (?, ?, ?)",
+                                 (algo, target_hash, password))
+            self._dirty += 1
+            if self._dirty >= COMMIT_EVERY:
+                self._commit()
+
+    def crack(self, lookup, target_hash, search, stats=None):
+        """Answer a lookup from the cache, or run search() and remember its result
+
+        lookup is the table or table set searched, for its algorithm and identity();
+        search() returns (password, success). While it runs, identical lookups wait
+        for its result. Cache hits and coalesced lookups are counted in stats.
+        """
+        table_id = lookup.identity()
+        cached = self._cached(lookup.algo, target_hash, table_id, stats)
+        if cached is not None:
+            return cached
+        result, leader = self.inflight.run(
+            self.inflight_key(lookup.algo, target_hash, table_id),
+            lambda: self._search_and_store(lookup.algo, target_hash, table_id, search))
+        if not leader and stats is not None:
+            stats.coalesced += 1
+        return result
+
+    async def crack_async(self, lookup, target_hash, search, stats=None, run_sync=asyncio.to_thread):
+        """crack() for asyncio callers
+
+        The search runs in a worker thread through run_sync(func), which defaults to
+        asyncio.to_thread; identical lookups await its result without holding a thread.
+        """
+        table_id = lookup.identity()
+        cached = self._cached(lookup.algo, target_hash, table_id, stats)
+        if cached is not None:
+            return cached
+        result, leader = await self.inflight.run_async(
+            self.inflight_key(lookup.algo, target_hash, table_id),
+            lambda: run_sync(lambda: self._search_and_store(lookup.algo, target_hash,
+                                                            table_id, search)))
+        if not leader and stats is not None:
+            stats.coalesced += 1
+        return result
+
+    def crack_many(self, algo, table_id, target_hashes, search, stats=None):
+        """crack() for a batch of hex hashes against the table with identity table_id
+
+        For searches run outside the process, such as by an engine worker. Cached
+        hashes are answered directly and hashes another lookup is already searching
+        wait for it; search(hashes) gets the rest, lowercase, and returns
+        {hash: password or None}. Returns that mapping for every distinct hash.
+        """
+        results = {}
+        pending = list(dict.fromkeys(h.strip().lower() for h in target_hashes))
+        while pending:
+            leading, waiting = {}, []
+            for target_hash in pending:
+                cached = self._cached(algo, target_hash, table_id, stats)
+                if cached is not None:
+                    results[target_hash] = cached[0]
+                    continue
+                key = self.inflight_key(algo, target_hash, table_id)
+                future, leader = self.inflight.claim(key)
+                if leader:
+                    leading[target_hash] = key
+                else:
+                    waiting.append((target_hash, future))
+            try:
+                found = search(list(leading)) if leading else {}
+                for target_hash, key in leading.items():
+                    password = found.get(target_hash)
+                    self.put(algo, target_hash, table_id, password)
+                    self.inflight.resolve(key, (password, password is not None))
+                    results[target_hash] = password
+            finally:
+                # Waiters of any lookup left unresolved retry it themselves
+                for key in leading.values():
+                    self.inflight.abandon(key)
+            self.flush()
+            pending = []
+            for target_hash, future in waiting:
+                try:
+                    results[target_hash] = future.result()[0]
+                except LookupAbandoned:
+                    pending.append(target_hash)
+                    continue
+                if stats is not None:
+                    stats.coalesced += 1
+        return results
+
+    def _cached(self, algo, target_hash, table_id, stats):
+        cached = self.get(algo, target_hash, table_id)
+        if cached is not None and stats is not None:
+            stats.cache_hits += 1
+        return cached
+
+    def _search_and_store(self, algo, target_hash, table_id, search):
+        # The previous leader may have stored the result since the cache was checked
+        with self._lock:
+            cached = self._get(algo, target_hash.lower(), table_id)
+        if cached is not None:
+            return cached
+        password, found = search()
+        self.put(algo, target_hash, table_id, password if found else None)
+        self.flush()
+        return password, found
+
+    @staticmethod
+    def inflight_key(algo, target_hash, table_id):
+        return algo, target_hash.lower(), table_id
+
+    def metrics(self):
+        """Counters of the cache and of lookup coalescing"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._entries),
+            "inflight": len(self.inflight),
+            "searches": self.inflight.leaders,
+            "coalesced": self.inflight.coalesced,
+        }
+
+    def _commit(self):
+        self._db.commit()
+        self._dirty = 0
+
+    def flush(self):
+        """Commit pending writes to the cache file"""
+        with self._lock:
+            if self._db is not None and self._dirty:
+                self._commit()
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,108 @@
+"""
+Rainbow Table Engine - Chain Primitives
+Hashing, reduction and chain walking shared by every entry point
+
+The chain loop works on raw digest bytes; passwords are decoded from the digest by the
+table Keyspace (see keyspace.py), which may span several password lengths. Hex strings are only produced by the str-based helpers at the end
+of this module, which the GUI, the demo and the API use at their boundaries.
+"""
+
+from .algorithms import hash_function
+from .keyspace import mix64, keyspace_for
+
+# Character set for password generation
+CHARSET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789@!#$%&*"
+
+def charset_bytes(charset):
+    """Encode a charset for the bytes-native chain loop (one byte per character)"""
+    return charset.encode("ascii")
+
+def reduction_salt(table_index):
+    """64-bit value XORed into the digest bits before reduction in table table_index
+
+    Each table index gets its own reduction family, so tables over the same keyspace
+    cover it independently. Table index 0 has salt 0: the unsalted reduction.
+    """
+    return mix64(table_index)
+
+# ============ BYTES-NATIVE CHAIN LOOP ============
+# The reduction is inlined in the hot loops below; reduce_digest is the reference form.
+def reduce_digest(digest, step, keyspace, salt=0):
+    """Reduction function: the keyspace password for digest at step"""
+    return keyspace.decode((int.from_bytes(digest[:keyspace.draw_bytes], "big") ^ salt) + step)
+
+def chain_endpoint(pwd, first_step, chain_len, hash_fn, keyspace, salt=0):
+    """Walk from pwd at chain position first_step and return the endpoint digest"""
+    decode = keyspace.decode
+    draw = keyspace.draw_bytes
+    from_bytes = int.from_bytes
+    for step in range(first_step, chain_len):
+        pwd = decode((from_bytes(hash_fn(pwd).digest()[:draw], "big") ^ salt) + step)
+    return hash_fn(pwd).digest()
+
+def extend_digest(digest, first_step, chain_len, hash_fn, keyspace, salt=0):
+    """Extend a digest seen at chain position first_step to its chain endpoint"""
+    decode = keyspace.decode
+    draw = keyspace.draw_bytes
+    from_bytes = int.from_bytes
+    for step in range(first_step, chain_len):
+        digest = hash_fn(decode((from_bytes(digest[:draw], "big") ^ salt) + step)).digest()
+    return digest
+
+def password_at(start, position, hash_fn, keyspace, salt=0):
+    """Return the password bytes at a given position of a chain"""
+    pwd = bytes(start)
+    for step in range(position):
+        pwd = reduce_digest(hash_fn(pwd).digest(), step, keyspace, salt)
+    return pwd
+
+def check_position(start, position, target_digest, hash_fn, keyspace, salt=0):
+    """Rebuild a chain only up to position and return its password there if it hashes to
+    target_digest, else None (a false alarm). Costs position + 1 hashes."""
+    pwd = password_at(start, position, hash_fn, keyspace, salt)
+    return pwd if hash_fn(pwd).digest() == target_digest else None
+
+def find_in_chain(start, target_digest, chain_len, hash_fn, keyspace, salt=0):
+    """Walk one chain from its start and return the password hashing to target_digest"""
+    pwd = bytes(start)
+    for step in range(chain_len + 1):
+        digest = hash_fn(pwd).digest()
+        if digest == target_digest:
+            return pwd
+        if step < chain_len:
+            pwd = reduce_digest(digest, step, keyspace, salt)
+    return None
+
+# ============ STR / HEX HELPERS ============
+def hash_password(password, algo="md5"):
+    """Generate hash for given password"""
+    return hash_function(algo)(password.encode()).hexdigest()
+
+def reduce_hash(hash_value, step, pwd_len, charset=CHARSET, table_index=0, min_pwd_len=None):
+    """Reduction function: converts hash to password"""
+    keyspace = keyspace_for(charset_bytes(charset), pwd_len, min_pwd_len)
+    return reduce_digest(bytes.fromhex(hash_value), step, keyspace,
+                         reduction_salt(table_index)).decode()
+
+def generate_chain(start_pwd, chain_len, algo, pwd_len, charset=CHARSET, table_index=0,
+                   min_pwd_len=None):
+    """Generate a complete rainbow table chain"""
+    keyspace = keyspace_for(charset_bytes(charset), pwd_len, min_pwd_len)
+    end = chain_endpoint(start_pwd.encode(), 0, chain_len, hash_function(algo), keyspace,
+                         reduction_salt(table_index))
+    # Return final hash (endpoint)
+    return end.hex()
+
+def walk_chain(start_pwd, position, algo, pwd_len, charset=CHARSET, table_index=0, min_pwd_len=None):
+    """Return the password found at a given position of a chain"""
+    keyspace = keyspace_for(charset_bytes(charset), pwd_len, min_pwd_len)
+    return password_at(start_pwd.encode(), position, hash_function(algo), keyspace,
+                       reduction_salt(table_index)).decode()
+
+def search_chain(start_pwd, target_hash, chain_len, algo, pwd_len, charset=CHARSET, table_index=0,
+                 min_pwd_len=None):
+    """Walk one chain from its start and return the password hashing to target_hash"""
+    keyspace = keyspace_for(charset_bytes(charset), pwd_len, min_pwd_len)
+    pwd = find_in_chain(start_pwd.encode(), bytes.fromhex(target_hash), chain_len,
+                        hash_function(algo), keyspace, reduction_salt(table_index))
+    return pwd.decode() if pwd is not None else None
@@ -0,0 +1,93 @@
+"""
+Rainbow Table Engine - Request Coalescing
+One search per (hash, table) however many identical lookups arrive at once
+
+The first lookup of a key leads: it runs the search and publishes the result through
+a future. Lookups of the same key that arrive while it runs wait on that future
+instead of searching again. A leader that gives up hands the key back, and its
+waiters retry, one of them as the new leader. Threads use run(); asyncio callers use
+run_async(), whose waiters await the future without holding a thread.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class LookupAbandoned(Exception):
+    """Set on the future of a lookup whose leader stopped before finishing"""
+
+class InflightLookups:
+    """Registry of the lookups in progress, shared by every thread that cracks"""
+
+    def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._futures)
+
+    def claim(self, key):
+        """(future, leader) for a lookup of key
+
+        leader is True for the first claim of a key not in progress; the caller must
+        then resolve() or abandon() it. Other callers wait on the future.
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._futures[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def resolve(self, key, result):
+        with self._lock:
+            future = self._futures.pop(key)
+        future.set_result(result)
+
+    def abandon(self, key):
+        with self._lock:
+            future = self._futures.pop(key, None)
+        if future is not None:
+            future.set_exception(LookupAbandoned(key))
+
+    def run(self, key, search):
+        """search() for key, shared with every concurrent run of the same key
+
+        Returns (result, leader), leader telling whether this call did the search.
+        """
+        while True:
+            future, leader = self.claim(key)
+            if not leader:
+                try:
+                    return future.result(), False
+                except LookupAbandoned:
+                    continue
+            try:
+                result = search()
+            except BaseException:
+                self.abandon(key)
+                raise
+            self.resolve(key, result)
+            return result, True
+
+    async def run_async(self, key, search):
+        """run() for asyncio callers; search is an async function"""
+        while True:
+            future, leader = self.claim(key)
+            if not leader:
+                try:
+                    # Shielded: a cancelled waiter must not cancel the shared future
+                    return await asyncio.shield(asyncio.wrap_future(future)), False
+                except LookupAbandoned:
+                    continue
+            try:
+                result = await search()
+            except BaseException:
+                self.abandon(key)
+                raise
+            self.resolve(key, result)
+            return result, True
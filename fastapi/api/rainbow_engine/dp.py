@@ -0,0 +1,205 @@
+"""
+Rainbow Table Engine - Distinguished-Point Tables
+Variable-length chains that end at the first digest with dp_bits leading zero bits
+
+Unlike rainbow chains, every step uses the same reduction, so a lookup does not need to
+guess the target's position: it walks forward from the target until it reaches a
+distinguished point (DP) and probes the table once. Chains shorter than min_len or
+without a DP within max_len hashes are dropped, which also bounds lookup walks.
+Chains that merge end at the same DP; generation keeps only the longest of them.
+"""
+
+import random
+
+import numpy as np
+
+from .algorithms import batch_hash_function
+from .chain import CHARSET, hash_function, charset_bytes, reduction_salt, reduce_digest
+from .keyspace import keyspace_for
+from .parallel import iter_batches, start_rows
+from .stats import LookupStats
+from .table import ChainLookup, CHAIN_ID_DTYPE, endpoint_dtype
+from .vectorized import hash_rows, reduce_digests
+
+LENGTH_DTYPE = np.dtype("<u4")
+
+# Reduction step used by every link of a DP chain
+DP_STEP = 0
+
+def dp_mask(digests, dp_bits):
+    """Which digest rows are distinguished points"""
+    x = np.ascontiguousarray(digests[:, :8]).view(">u8").ravel()
+    return (x >> np.uint64(64 - dp_bits)) == 0
+
+def is_distinguished(digest, dp_bits):
+    return int.from_bytes(digest[:8], "big") >> (64 - dp_bits) == 0
+
+def generate_dp_batch(start, stop, seed, min_len, max_len, dp_bits, algo, pwd_len, charset,
+                      table_index=0, min_pwd_len=None):
+    """Walk chain ids [start, stop) in lockstep until each reaches its first DP
+
+    Returns (endpoints, chain ids, lengths) as raw bytes for the kept chains, plus the
+    number of chains dropped for being too short and too long.
+    """
+    keyspace = keyspace_for(charset_bytes(charset), pwd_len, min_pwd_len)
+    hash_fn = hash_function(algo)
+    batch_fn = batch_hash_function(algo, pwd_len, min_pwd_len)
+    salt = reduction_salt(table_index)
+    rows, row_lengths = start_rows(start, stop, seed, keyspace)
+    ids = np.arange(start, stop, dtype=CHAIN_ID_DTYPE)
+    ends, kept_ids, lengths = [], [], []
+    too_short = 0
+    for length in range(1, max_len + 1):
+        if not len(ids):
+            break
+        digests = hash_rows(rows, hash_fn, batch_fn, row_lengths)
+        done = dp_mask(digests, dp_bits)
+        if done.any():
+            if length < min_len:
+                too_short += int(done.sum())
+            else:
+                ends.append(digests[done])
+                kept_ids.append(ids[done])
+                lengths.append(np.full(int(done.sum()), length, dtype=LENGTH_DTYPE))
+            live = ~done
+            digests, ids = digests[live], ids[live]
+        rows, row_lengths = reduce_digests(digests, DP_STEP, keyspace, salt)
+    too_long = len(ids)
+    if ends:
+        ends = np.concatenate(ends).tobytes()
+        kept_ids = np.concatenate(kept_ids).tobytes()
+        lengths = np.concatenate(lengths).tobytes()
+    else:
+        ends = kept_ids = lengths = b""
+    return ends, kept_ids, lengths, too_short, too_long
+
+class DistinguishedPointTable(ChainLookup):
+    """In-memory distinguished-point table
+
+    Sorted by endpoint like a RainbowTable, with the length of every chain kept so a
+    match can be verified by rebuilding the chain exactly up to the target's position.
+    """
+
+    def __init__(self, pwd_len=8, min_len=100, max_len=5000, dp_bits=10, algo="md5",
+                 charset=CHARSET, table_index=0, min_pwd_len=None):
+        if not 0 < dp_bits < 64:
+            raise ValueError("dp_bits must be between 1 and 63")
+        if not 0 < min_len <= max_len:
+            raise ValueError("min_len must be positive and not above max_len")
+        self._init_params(pwd_len, max_len, algo, charset, table_index, None, min_pwd_len)
+        self.min_len = min_len
+        self.max_len = max_len
+        self.dp_bits = dp_bits
+        self.generation_stats = {}
+        self.endpoints = np.empty(0, dtype=endpoint_dtype(self.digest_size))
+        self.chain_ids = np.empty(0, dtype=CHAIN_ID_DTYPE)
+        self.lengths = np.empty(0, dtype=LENGTH_DTYPE)
+
+    @property
+    def nbytes(self):
+        return super().nbytes + self.lengths.nbytes
+
+    @property
+    def total_hashes(self):
+        return int(self.lengths.sum())
+
+    def _content_arrays(self):
+        return self.endpoints, self.chain_ids, self.lengths
+
+    def generate(self, num_chains, progress=None, seed=None, workers=1, batch_size=4096):
+        """Generate chains 0..num_chains-1 for a seed, merging chains that share a DP
+
+        generation_stats afterwards reports how many chains were dropped as too short or
+        too long, how many merged into a longer chain, and the merge rate.
+        """
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        ends, ids, lengths = [], [], []
+        too_short = too_long = done = 0
+        args = (seed, self.min_len, self.max_len, self.dp_bits, self.algo, self.pwd_len,
+                self.charset, self.table_index, self.min_pwd_len)
+        for batch in iter_batches(generate_dp_batch, 0, num_chains, args,
+                                  workers=workers, batch_size=batch_size):
+            ends.append(batch[0])
+            ids.append(batch[1])
+            lengths.append(batch[2])
+            too_short += batch[3]
+            too_long += batch[4]
+            done += len(batch[1]) // CHAIN_ID_DTYPE.itemsize + batch[3] + batch[4]
+            if progress:
+                progress(done, num_chains)
+
+        endpoints = np.frombuffer(b"".join(ends), dtype=endpoint_dtype(self.digest_size))
+        chain_ids = np.frombuffer(b"".join(ids), dtype=CHAIN_ID_DTYPE)
+        lengths = np.frombuffer(b"".join(lengths), dtype=LENGTH_DTYPE)
+
+        # Longest chain first within each endpoint, lowest id on ties; keep the first
+        order = np.lexsort((chain_ids, -lengths.astype(np.int64), endpoints))
+        endpoints, chain_ids, lengths = endpoints[order], chain_ids[order], lengths[order]
+        first = np.ones(len(endpoints), dtype=bool)
+        first[1:] = endpoints[1:] != endpoints[:-1]
+        self.endpoints, self.chain_ids, self.lengths = endpoints[first], chain_ids[first], lengths[first]
+
+        ended = len(endpoints)
+        self.generation_stats = {
+            "generated": num_chains,
+            "too_short": too_short,
+            "too_long": too_long,
+            "merged": ended - len(self.endpoints),
+            "merge_rate": (ended - len(self.endpoints)) / ended if ended else 0.0,
+            "kept": len(self.endpoints),
+        }
+        return self
+
+    def _walk_to_dp(self, target, stats):
+        """Walk forward from the target digest to its DP; returns (dp, steps) or (None, steps)"""
+        digest = target
+        for steps in range(self.max_len):
+            if is_distinguished(digest, self.dp_bits):
+                return digest, steps
+            digest = self._hash_fn(reduce_digest(digest, DP_STEP, self._keyspace, self._salt)).digest()
+            stats.candidate_hashes += 1
+        return None, self.max_len
+
+    def password_at(self, start_pwd, position):
+        """Return the password at a position of the DP chain starting at start_pwd"""
+        if isinstance(start_pwd, str):
+            start_pwd = start_pwd.encode()
+        pwd = bytes(start_pwd)
+        for _ in range(position):
+            pwd = reduce_digest(self._hash_fn(pwd).digest(), DP_STEP, self._keyspace, self._salt)
+        return pwd.decode()
+
+    def crack(self, target_hash, progress=None, stats=None, algo=None, cache=None):
+        """Attempt to crack a hex hash: one walk to the next DP and one table probe
+
+        Returns (password, success); stats, a LookupStats, collects the work done.
+        cache, a ResultCache, answers repeated lookups and remembers new results.
+        """
+        if stats is None:
+            stats = LookupStats()
+        if cache is not None:
+            self.target_digest(target_hash, algo)
+            return cache.crack(self, target_hash,
+                               lambda: self.crack(target_hash, progress, stats, algo), stats)
+        target = self.target_digest(target_hash, algo)
+        dp, steps = self._walk_to_dp(target, stats)
+        if dp is None:
+            return None, False
+        key = np.array(dp, dtype=self.endpoints.dtype)
+        lo = np.searchsorted(self.endpoints, key, side="left")
+        hi = np.searchsorted(self.endpoints, key, side="right")
+        for chain_id, length in zip(self.chain_ids[lo:hi], self.lengths[lo:hi]):
+            position = int(length) - 1 - steps
+            if position < 0:
+                # The target sits on another chain that merges into this one
+                stats.add_verification(0, False)
+                continue
+            pwd = self.password_at(self.start_point(chain_id), position)
+            hit = self._hash_fn(pwd.encode()).digest() == target
+            stats.add_verification(position + 1, hit)
+            if hit:
+                stats.position = position
+                return pwd, True
+        return None, False
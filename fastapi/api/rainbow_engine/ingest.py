@@ -0,0 +1,147 @@
+"""
+Rainbow Table Engine - Hash List Ingestion
+Streaming parser turning hex hash lists into deduplicated raw digest batches
+
+Input arrives as byte chunks of any size, from a file or an HTTP upload, with one hex
+hash per line. Every chunk is parsed in bulk with numpy into an (N, digest_size) uint8
+array, so only one chunk of text and one batch of digests are held at a time. Digests
+already seen are dropped; the record of them is a sorted binary array of
+digest_size bytes per distinct hash.
+"""
+
+import numpy as np
+
+# Hashes handed to lookup at once
+DEFAULT_BATCH_HASHES = 1 << 16
+
+# Bytes read from a file per chunk
+READ_CHUNK_BYTES = 1 << 20
+
+# Lines longer than this are rejected without being buffered
+MAX_LINE_BYTES = 1024
+
+# Nibble value of every ASCII byte, 255 for non-hex characters
+_NIBBLES = np.full(256, 255, dtype=np.uint8)
+_NIBBLES[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+_NIBBLES[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+_NIBBLES[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+
+def parse_hex_lines(lines, digest_size):
+    """Decode a list of stripped hex lines into an (N, digest_size) uint8 array
+
+    Returns (digests, invalid): lines of the wrong length or with non-hex characters
+    are counted in invalid and left out.
+    """
+    width = 2 * digest_size
+    good = [line for line in lines if len(line) == width]
+    invalid = len(lines) - len(good)
+    text = np.frombuffer(b"".join(good), dtype=np.uint8).reshape(len(good), width)
+    nibbles = _NIBBLES[text]
+    ok = (nibbles != 255).all(axis=1)
+    if not ok.all():
+        invalid += int(len(ok) - ok.sum())
+        nibbles = nibbles[ok]
+    return (nibbles[:, 0::2] << 4) | nibbles[:, 1::2], invalid
+
+class HashListReader:
+    """Incremental parser of a hex hash list for one digest size
+
+    feed() takes byte chunks split anywhere, even inside a line, and returns the
+    batches of new distinct digests that became complete; close() returns the rest.
+    Blank lines are skipped; lines, invalid and duplicates count the rest.
+    """
+
+    def __init__(self, digest_size, batch_hashes=DEFAULT_BATCH_HASHES, dedupe=True):
+        self.digest_size = digest_size
+        self.batch_hashes = batch_hashes
+        self.dedupe = dedupe
+        self.lines = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self._dtype = np.dtype(f"S{digest_size}")
+        self._seen = np.empty(0, dtype=self._dtype)
+        self._tail = b""
+        self._skipping = False
+        self._pending = []
+        self._pending_rows = 0
+
+    def feed(self, chunk):
+        """Parse a chunk of the list; returns the batches completed by it"""
+        data = self._tail + bytes(chunk)
+        end = data.rfind(b"\n")
+        if end < 0:
+            # Still inside a line already rejected as too long: it was counted then
+            self._tail = b"" if self._skipping else data
+        else:
+            self._tail = data[end + 1:]
+            lines = data[:end].split(b"\n")
+            if self._skipping:
+                # The first line continues one already rejected as too long
+                lines = lines[1:]
+                self._skipping = False
+            self._parse(lines)
+        if len(self._tail) > MAX_LINE_BYTES:
+            self.lines += 1
+            self.invalid += 1
+            self._tail = b""
+            self._skipping = True
+        return self._batches(final=False)
+
+    def close(self):
+        """Parse the unterminated last line; returns the remaining batches"""
+        if self._tail and not self._skipping:
+            self._parse([self._tail])
+        self._tail = b""
+        self._skipping = False
+        return self._batches(final=True)
+
+    def batches(self, chunks):
+        """Every batch of an iterable of byte chunks"""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.close()
+
+    def _parse(self, lines):
+        lines = [line for line in (line.strip() for line in lines) if line]
+        if not lines:
+            return
+        digests, invalid = parse_hex_lines(lines, self.digest_size)
+        self.lines += len(lines)
+        self.invalid += invalid
+        if len(digests):
+            self._pending.append(digests)
+            self._pending_rows += len(digests)
+
+    def _batches(self, final):
+        out = []
+        while self._pending_rows >= self.batch_hashes or (final and self._pending_rows):
+            rows = np.concatenate(self._pending)
+            batch, rest = rows[:self.batch_hashes], rows[self.batch_hashes:]
+            self._pending = [rest] if len(rest) else []
+            self._pending_rows = len(rest)
+            batch = self._distinct(batch)
+            if len(batch):
+                out.append(batch)
+        return out
+
+    def _distinct(self, batch):
+        """Rows of a batch not seen before, recording them as seen"""
+        if not self.dedupe:
+            return batch
+        keys = np.ascontiguousarray(batch).view(self._dtype).ravel()
+        keys, first = np.unique(keys, return_index=True)
+        pos = np.searchsorted(self._seen, keys)
+        new = pos >= len(self._seen)
+        new[~new] = self._seen[pos[~new]] != keys[~new]
+        self._seen = np.insert(self._seen, pos[new], keys[new])
+        self.duplicates += len(batch) - int(new.sum())
+        return batch[np.sort(first[new])]
+
+def read_chunks(path, chunk_bytes=READ_CHUNK_BYTES):
+    """Byte chunks of a file, read one at a time"""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                return
+            yield chunk
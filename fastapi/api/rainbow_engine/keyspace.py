@@ -0,0 +1,215 @@
+"""
+Rainbow Table Engine - Keyspace Mapping
+Numbers every password of a length range over a charset and maps chain indices to
+start passwords
+
+Index 0..base^min_len - 1 are the min_len-character passwords, followed by every
+longer length in turn. Within a length the index is written in base len(charset),
+least significant character first, so a fixed-length keyspace decodes exactly like
+the original per-digit reduction. Decoding goes through a precomputed table of
+multi-character chunks: a password costs one divmod and lookup per chunk instead of
+one big-int division per character.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+# Upper bound on the entries of the chunk table
+CHUNK_ENTRIES = 1 << 16
+
+def mix64(x):
+    """SplitMix64 finaliser: a bijective mixer of 64-bit integers"""
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+class Keyspace:
+    """Every password of min_len..max_len characters over a charset, numbered 0..size-1"""
+
+    def __init__(self, charset, max_len, min_len=None):
+        min_len = max_len if min_len is None else min_len
+        if not 0 < min_len <= max_len:
+            raise ValueError("password lengths must satisfy 0 < min_len <= max_len")
+        if len(charset) < 2 or len(set(charset)) != len(charset):
+            raise ValueError("charset needs at least two distinct characters")
+        self.charset = bytes(charset)
+        self.base = len(charset)
+        self.min_len = min_len
+        self.max_len = max_len
+        self.ranges = []
+        offset = 0
+        for length in range(min_len, max_len + 1):
+            count = self.base ** length
+            self.ranges.append((length, offset, count))
+            offset += count
+        self.size = offset
+
+        # Digest bytes drawn per reduction: 64 bits, or enough bits for a larger keyspace
+        # with a 32-bit margin against modulo bias (bounded by the digest size, see
+        # draw_width)
+        if self.size <= 1 << 64:
+            self.draw_bytes = 8
+        else:
+            self.draw_bytes = 8 * -(-(self.size.bit_length() + 32) // 64)
+
+        self.chunk_len = 1
+        while self.base ** (self.chunk_len + 1) <= CHUNK_ENTRIES:
+            self.chunk_len += 1
+        self.chunk_count = self.base ** self.chunk_len
+        rest = np.arange(self.chunk_count)
+        symbols = np.frombuffer(self.charset, dtype=np.uint8)
+        self._chunk_rows = np.empty((self.chunk_count, self.chunk_len), dtype=np.uint8)
+        for i in range(self.chunk_len):
+            self._chunk_rows[:, i] = symbols[rest % self.base]
+            rest //= self.base
+        self._chunk_cells = self._chunk_rows.view(f"V{self.chunk_len}").ravel()
+        data = self._chunk_rows.tobytes()
+        k = self.chunk_len
+        self._chunks = [data[i:i + k] for i in range(0, len(data), k)]
+
+        # Row decoding works in uint64 and needs every index to fit
+        self.fits_uint64 = self.size < 1 << 64
+        if self.fits_uint64 and min_len != max_len:
+            self._starts = np.array([offset for _, offset, _ in self.ranges], dtype=np.uint64)
+            self._ends = np.array([offset + count for _, offset, count in self.ranges],
+                                  dtype=np.uint64)
+        self.decode = self._make_decoder()
+
+    @property
+    def fixed(self):
+        return self.min_len == self.max_len
+
+    def draw_width(self, digest_size):
+        """Digest bytes a reduction reads from a digest of digest_size bytes
+
+        draw_bytes clamped to the digest: a shorter digest is read whole, as the byte
+        slices of reduce_digest do.
+        """
+        return min(self.draw_bytes, digest_size)
+
+    def _digits(self, value, length):
+        """length characters of value in base len(charset), least significant first"""
+        chunks, count = self._chunks, self.chunk_count
+        full, rest = divmod(length, self.chunk_len)
+        parts = []
+        for _ in range(full):
+            value, r = divmod(value, count)
+            parts.append(chunks[r])
+        if rest:
+            parts.append(chunks[value][:rest])
+        return b"".join(parts)
+
+    def password(self, index):
+        """Password bytes of a keyspace index in [0, size)"""
+        for length, offset, count in self.ranges:
+            if index < offset + count:
+                return self._digits(index - offset, length)
+        raise ValueError("index outside the keyspace")
+
+    def _make_decoder(self):
+        """decode(num): password of num modulo the keyspace size, for any num >= 0"""
+        size = self.size
+        if not self.fixed:
+            password = self.password
+            return lambda num: password(num % size)
+        chunks, count = self._chunks, self.chunk_count
+        full, rest = divmod(self.max_len, self.chunk_len)
+
+        def decode(num):
+            num %= size
+            parts = []
+            for _ in range(full):
+                num, r = divmod(num, count)
+                parts.append(chunks[r])
+            if rest:
+                parts.append(chunks[num][:rest])
+            return b"".join(parts)
+
+        return decode
+
+    def password_rows(self, values):
+        """Decode a uint64 array, taken modulo size, into password rows
+
+        Returns (rows, lengths): an (N, max_len) uint8 array and the length of every row,
+        or None for a fixed-length keyspace. Characters past a row's length are padding.
+        Every chunk is gathered into a whole k-byte cell of the rows at once.
+        """
+        if self.fixed:
+            # The low max_len digits are the same with or without the modulo
+            value, lengths = values, None
+        else:
+            index = values % np.uint64(self.size)
+            slot = np.searchsorted(self._ends, index, side="right")
+            value = index - self._starts[slot]
+            lengths = slot + self.min_len
+        cells = -(-self.max_len // self.chunk_len)
+        rows = np.empty((len(values), cells * self.chunk_len), dtype=np.uint8)
+        view = rows.view(self._chunk_cells.dtype)
+        count = np.uint64(self.chunk_count)
+        for cell in range(cells):
+            value, r = np.divmod(value, count)
+            view[:, cell] = self._chunk_cells.take(r)
+        return rows[:, :self.max_len], lengths
+
+    def limb_password_rows(self, limbs):
+        """password_rows for numbers too large for uint64, in a fixed-length keyspace
+
+        limbs is an (N, K) uint64 array holding every number as K 32-bit digits, most
+        significant first; it is consumed. Each chunk is the remainder of a long
+        division of the limbs by the chunk count, which stays below 2^48 throughout.
+        """
+        if not self.fixed:
+            raise ValueError("limb decoding needs a fixed-length keyspace")
+        cells = -(-self.max_len // self.chunk_len)
+        rows = np.empty((len(limbs), cells * self.chunk_len), dtype=np.uint8)
+        view = rows.view(self._chunk_cells.dtype)
+        count = np.uint64(self.chunk_count)
+        shift = np.uint64(32)
+        top = 0
+        for cell in range(cells):
+            # Leading limbs the divisions have already emptied are skipped
+            while top < limbs.shape[1] - 1 and not limbs[:, top].any():
+                top += 1
+            r = np.zeros(len(limbs), dtype=np.uint64)
+            for i in range(top, limbs.shape[1]):
+                limbs[:, i], r = np.divmod((r << shift) | limbs[:, i], count)
+            view[:, cell] = self._chunk_cells.take(r)
+        return rows[:, :self.max_len]
+
+    def pack(self, passwords):
+        """Password bytes as (rows, lengths) in the layout of password_rows"""
+        if self.fixed:
+            rows = np.frombuffer(b"".join(passwords), dtype=np.uint8)
+            return rows.reshape(len(passwords), self.max_len), None
+        rows = np.full((len(passwords), self.max_len), self.charset[0], dtype=np.uint8)
+        lengths = np.empty(len(passwords), dtype=np.intp)
+        for i, pwd in enumerate(passwords):
+            rows[i, :len(pwd)] = np.frombuffer(pwd, dtype=np.uint8)
+            lengths[i] = len(pwd)
+        return rows, lengths
+
+@lru_cache(maxsize=32)
+def keyspace_for(charset, max_len, min_len=None):
+    """Shared Keyspace for charset bytes and a length range, built once per process"""
+    return Keyspace(charset, max_len, min_len)
+
+def start_point(seed, chain_id, keyspace):
+    """Start password of chain chain_id in a table generated with seed
+
+    Each chain draws its keyspace index from the SplitMix64 stream at position chain_id,
+    so any index range can be regenerated on its own, in any order, on any worker.
+    """
+    size = keyspace.size
+    x = (seed + (chain_id + 1) * GOLDEN_GAMMA) & MASK64
+    value = mix64(x)
+    bits = 64
+    # Draw 64 more bits than the keyspace needs so the modulo bias stays negligible
+    while bits < size.bit_length() + 64:
+        x = (x + GOLDEN_GAMMA) & MASK64
+        value = (value << 64) | mix64(x)
+        bits += 64
+    return keyspace.password(value % size)
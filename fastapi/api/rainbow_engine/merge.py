@@ -0,0 +1,97 @@
+"""
+Rainbow Table Engine - External Merge
+K-way merge of sorted table files into one table with bounded memory
+
+Every input is memory-mapped and read one block at a time. A merge round takes the
+smallest last (endpoint, chain id) key over the input blocks that still have rows
+after them; every row up to that key, from every block, is sorted and written out,
+so a round never emits a row that a later block could precede. Peak memory is
+bounded by buffer_chains rows whatever the size of the tables.
+"""
+
+import numpy as np
+
+from .storage import TableWriter, load_table
+from .table import sort_chains, unique_endpoints
+
+DEFAULT_BUFFER_CHAINS = 1 << 20
+
+# Parameters that must agree for chains of two tables to be interchangeable
+MERGE_PARAMS = ("pwd_len", "min_pwd_len", "chain_len", "algo", "charset", "table_index", "seed")
+
+def _count_upto(endpoints, chain_ids, bound):
+    """Rows of a sorted block whose (endpoint, chain id) key is not above bound"""
+    key = np.array(bound[0], dtype=endpoints.dtype)
+    lo = np.searchsorted(endpoints, key, side="left")
+    hi = np.searchsorted(endpoints, key, side="right")
+    return int(lo + np.searchsorted(chain_ids[lo:hi], bound[1], side="right"))
+
+def merge_sorted(sources, writer, buffer_chains=DEFAULT_BUFFER_CHAINS, perfect=False):
+    """Merge sorted (endpoints, chain_ids) array pairs into a TableWriter
+
+    Chains present in several sources are written once. With perfect=True only the
+    lowest-id chain of every endpoint is kept. Returns the number of input chains.
+    """
+    block = max(buffer_chains // max(len(sources), 1), 1)
+    pos = [0] * len(sources)
+    total = sum(len(ids) for _, ids in sources)
+    last_end = None
+    while True:
+        live = [i for i, (_, ids) in enumerate(sources) if pos[i] < len(ids)]
+        if not live:
+            break
+        bound = None
+        for i in live:
+            ends, ids = sources[i]
+            stop = pos[i] + block
+            if stop < len(ids):
+                key = (bytes(ends[stop - 1]), int(ids[stop - 1]))
+                if bound is None or key < bound:
+                    bound = key
+
+        ends_parts, id_parts = [], []
+        for i in live:
+            ends, ids = sources[i]
+            ends, ids = ends[pos[i]:pos[i] + block], ids[pos[i]:pos[i] + block]
+            take = len(ids) if bound is None else _count_upto(ends, ids, bound)
+            ends_parts.append(ends[:take])
+            id_parts.append(ids[:take])
+            pos[i] += take
+        ends, ids = sort_chains(np.concatenate(ends_parts), np.concatenate(id_parts))
+
+        # Copies of a chain always land in the same round, next to each other
+        keep = np.ones(len(ids), dtype=bool)
+        if perfect:
+            keep = unique_endpoints(ends)
+            if last_end is not None and len(ends):
+                keep &= ends != last_end
+        else:
+            keep[1:] = (ends[1:] != ends[:-1]) | (ids[1:] != ids[:-1])
+        ends, ids = ends[keep], ids[keep]
+        if len(ends):
+            last_end = ends[-1]
+            writer.write(ends, ids)
+    return total
+
+def merge_tables(paths, out_path, buffer_chains=DEFAULT_BUFFER_CHAINS, perfect=False):
+    """Merge table files built with the same parameters and seed into out_path
+
+    Returns merge statistics: input chains, chains written and chains dropped as
+    duplicates (or, with perfect=True, as merged into a lower-id chain).
+    """
+    tables = [load_table(path) for path in paths]
+    try:
+        if not tables:
+            raise ValueError("no tables to merge")
+        first = tables[0]
+        for table in tables[1:]:
+            for name in MERGE_PARAMS:
+                if getattr(table, name) != getattr(first, name):
+                    raise ValueError(f"{table.path}: {name} differs from {first.path}")
+        with TableWriter(out_path, first) as writer:
+            total = merge_sorted([(t.endpoints, t.chain_ids) for t in tables], writer,
+                                 buffer_chains, perfect)
+        return {"chains": total, "written": writer.count, "dropped": total - writer.count}
+    finally:
+        for table in tables:
+            table.close()
@@ -0,0 +1,63 @@
+"""
+Rainbow Table Engine - Parallel Generation
+Splits a chain index range across worker processes and streams batches back in order
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .algorithms import batch_hash_function
+from .chain import hash_function, charset_bytes, reduction_salt
+from .keyspace import keyspace_for, start_point
+from .vectorized import chain_endpoints
+
+def start_rows(start, stop, seed, keyspace):
+    """Start passwords of chain ids [start, stop) as (rows, lengths), see Keyspace.pack"""
+    return keyspace.pack([start_point(seed, chain_id, keyspace)
+                          for chain_id in range(start, stop)])
+
+def generate_batch(start, stop, seed, chain_len, algo, pwd_len, charset, table_index=0,
+                   min_pwd_len=None):
+    """Generate the chains with indices in [start, stop)
+
+    The chains of a batch are walked in lockstep. Returns (start, endpoints) where
+    endpoints is the concatenation of the raw endpoint digests in chain index order,
+    which is cheap to send back from a worker process.
+    """
+    keyspace = keyspace_for(charset_bytes(charset), pwd_len, min_pwd_len)
+    rows, lengths = start_rows(start, stop, seed, keyspace)
+    ends = chain_endpoints(rows, lengths, chain_len, hash_function(algo), keyspace,
+                           batch_hash_function(algo, pwd_len, min_pwd_len),
+                           reduction_salt(table_index))
+    return start, ends.tobytes()
+
+def default_workers():
+    return os.cpu_count() or 1
+
+def iter_batches(task, first, stop, args, workers=None, batch_size=4096):
+    """Yield task(start, end, *args) for consecutive [start, end) slices of [first, stop)
+
+    With more than one worker the slices are spread over a process pool; results are
+    still yielded in index order so the output does not depend on the worker count.
+    task must be a module-level function so it can be sent to the workers.
+    """
+    workers = workers or default_workers()
+    if workers > 1:
+        # Keep every worker busy even when the range is small
+        batch_size = max(1, min(batch_size, -(-(stop - first) // (workers * 2))))
+    ranges = [(start, min(start + batch_size, stop))
+              for start in range(first, stop, batch_size)]
+
+    if workers <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield task(start, end, *args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(task, start, end, *args) for start, end in ranges]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,53 @@
+"""
+Rainbow Table Engine - Lookup Statistics
+Per-lookup accounting of candidate work, endpoint matches and false alarms
+"""
+
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+@dataclass
+class LookupStats:
+    """Work done by one lookup
+
+    A false alarm is an endpoint match whose chain turns out not to contain the target
+    at the matched position; the hashes spent reconstructing it are wasted_hashes.
+    cache_hits counts targets answered by a ResultCache without any search, coalesced
+    those answered by an identical lookup that was already running.
+    """
+    candidate_hashes: int = 0
+    endpoint_matches: int = 0
+    false_alarms: int = 0
+    verify_hashes: int = 0
+    wasted_hashes: int = 0
+    cache_hits: int = 0
+    coalesced: int = 0
+    position: Optional[int] = None
+
+    @property
+    def total_hashes(self):
+        return self.candidate_hashes + self.verify_hashes
+
+    def add_verification(self, hashes, hit):
+        self.endpoint_matches += 1
+        self.verify_hashes += hashes
+        if not hit:
+            self.false_alarms += 1
+            self.wasted_hashes += hashes
+
+    def merge(self, other):
+        """Add the work of another lookup of the same target, e.g. on another table"""
+        self.candidate_hashes += other.candidate_hashes
+        self.endpoint_matches += other.endpoint_matches
+        self.false_alarms += other.false_alarms
+        self.verify_hashes += other.verify_hashes
+        self.wasted_hashes += other.wasted_hashes
+        self.cache_hits += other.cache_hits
+        self.coalesced += other.coalesced
+        if self.position is None:
+            self.position = other.position
+
+    def to_dict(self):
+        data = asdict(self)
+        data["total_hashes"] = self.total_hashes
+        return data
@@ -0,0 +1,188 @@
+"""
+Rainbow Table Engine - On-Disk Tables
+Versioned binary table files with memory-mapped binary-search lookup
+
+File layout (little-endian):
+    header     magic "RBTB", format version, algorithm, pwd_len (maximum password
+               length), min_pwd_len, chain_len, table index, charset length,
+               record count, generation seed
+    charset    charset_len ASCII bytes
+    endpoints  count raw endpoint digests (digest_size bytes each), sorted
+    chain ids  count uint64 chain ids, aligned with the endpoints
+
+Start passwords are not stored: they are re-derived from (seed, chain id). Chain
+lengths are not stored either, so distinguished-point tables cannot be saved.
+Version 2 files, which predate min_pwd_len, are still read as fixed-length tables.
+"""
+
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+
+import numpy as np
+
+from .table import ChainLookup, CHAIN_ID_DTYPE, endpoint_dtype
+
+MAGIC = b"RBTB"
+FORMAT_VERSION = 3
+PREFIX = struct.Struct("<4sH")
+HEADER = struct.Struct("<4sH16sHHIIHQQ")
+HEADER_V2 = struct.Struct("<4sH16sHIIHQQ")
+
+class TableFormatError(ValueError):
+    """Raised when a file is not a rainbow table this version can read"""
+
+def _pack_header(table, count):
+    if hasattr(table, "dp_bits"):
+        raise TypeError("distinguished-point tables cannot be saved: table files hold "
+                        "fixed-length chains only")
+    charset = table.charset.encode("ascii")
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, table.algo.encode("ascii"), table.pwd_len,
+                         table.min_pwd_len, table.chain_len, table.table_index, len(charset),
+                         count, table.seed or 0)
+    return header + charset
+
+def save_table(table, path):
+    """Write a table to path; TypeError for a distinguished-point table"""
+    header = _pack_header(table, len(table))
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(np.ascontiguousarray(table.endpoints).tobytes())
+        f.write(np.ascontiguousarray(table.chain_ids, dtype=CHAIN_ID_DTYPE).tobytes())
+    return path
+
+class TableWriter:
+    """Streaming writer for a table file whose chains arrive in sorted order
+
+    Endpoint blocks go straight to path and chain id blocks to a side file that is
+    appended when the writer is closed, after which the record count is written into
+    the header. Memory use is bounded by the blocks passed to write.
+    """
+
+    def __init__(self, path, params):
+        self.path = str(path)
+        self.count = 0
+        self._params = params
+        self._ends_dtype = endpoint_dtype(params.digest_size)
+        self._ids_path = self.path + ".ids"
+        self._file = open(self.path, "wb")
+        self._ids = open(self._ids_path, "w+b")
+        self._file.write(_pack_header(params, 0))
+
+    def write(self, endpoints, chain_ids):
+        """Append a block of chains, which must sort after every chain written so far"""
+        self._file.write(np.ascontiguousarray(endpoints, dtype=self._ends_dtype).tobytes())
+        self._ids.write(np.ascontiguousarray(chain_ids, dtype=CHAIN_ID_DTYPE).tobytes())
+        self.count += len(chain_ids)
+
+    def close(self):
+        self._ids.seek(0)
+        shutil.copyfileobj(self._ids, self._file)
+        self._file.seek(0)
+        self._file.write(_pack_header(self._params, self.count))
+        self._file.close()
+        self._ids.close()
+        os.remove(self._ids_path)
+
+    def abort(self):
+        """Close and delete a partly written table"""
+        self._file.close()
+        self._ids.close()
+        os.remove(self.path)
+        os.remove(self._ids_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class MappedTable(ChainLookup):
+    """Read-only table served straight from a memory-mapped file
+
+    The endpoint and chain id columns are numpy views over the mapping, so opening a
+    table costs one header read and the resident set only grows with the pages that
+    lookups actually touch.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise TableFormatError(f"{self.path}: empty file")
+        except BaseException:
+            self._file.close()
+            raise
+        try:
+            self._read_header()
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_header(self):
+        if len(self._map) < PREFIX.size:
+            raise TableFormatError(f"{self.path}: truncated header")
+        magic, version = PREFIX.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise TableFormatError(f"{self.path}: not a rainbow table file")
+        header = {FORMAT_VERSION: HEADER, 2: HEADER_V2}.get(version)
+        if header is None:
+            raise TableFormatError(f"{self.path}: unsupported table format version {version}")
+        if len(self._map) < header.size:
+            raise TableFormatError(f"{self.path}: truncated header")
+        fields = header.unpack_from(self._map, 0)
+        if version == 2:
+            # Fixed-length table: min_pwd_len equals pwd_len
+            fields = fields[:4] + fields[3:4] + fields[4:]
+        _, _, algo, pwd_len, min_pwd_len, chain_len, table_index, charset_len, count, seed = fields
+        try:
+            charset = self._map[header.size:header.size + charset_len].decode("ascii")
+            self._init_params(pwd_len, chain_len, algo.rstrip(b"\0").decode("ascii"), charset,
+                              table_index, seed, min_pwd_len)
+        except ValueError as e:
+            # UnicodeDecodeError included: a corrupt charset or algorithm name
+            raise TableFormatError(f"{self.path}: {e}")
+        offset = header.size + charset_len
+        ends_dtype = endpoint_dtype(self.digest_size)
+        if len(self._map) < offset + count * (ends_dtype.itemsize + CHAIN_ID_DTYPE.itemsize):
+            raise TableFormatError(f"{self.path}: truncated records")
+        self.endpoints = np.frombuffer(self._map, dtype=ends_dtype, count=count, offset=offset)
+        self.chain_ids = np.frombuffer(self._map, dtype=CHAIN_ID_DTYPE, count=count,
+                                       offset=offset + count * ends_dtype.itemsize)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def identity(self):
+        """Hex digest of the table parameters and the file's size and modification time
+
+        Hashing the chains would read the whole file; any rewrite of it, such as an
+        append or a merge into it, changes its modification time instead.
+        """
+        stat = os.fstat(self._file.fileno())
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((type(self).__name__, self.algo, self.pwd_len, self.min_pwd_len,
+                       self.chain_len, self.charset, self.table_index, self.seed, len(self),
+                       stat.st_size, stat.st_mtime_ns)).encode())
+        return h.hexdigest()
+
+    def close(self):
+        # The numpy views must go before the mapping can be closed
+        self.endpoints = self.chain_ids = None
+        self._map.close()
+        self._file.close()
+
+def load_table(path):
+    """Open a table file for lookups"""
+    return MappedTable(path)
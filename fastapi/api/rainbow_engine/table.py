@@ -0,0 +1,373 @@
+"""
+Rainbow Table Engine - Table Object
+Generation, lookup and verification of a single rainbow table
+"""
+
+import hashlib
+import random
+
+import numpy as np
+
+from .algorithms import AlgorithmMismatchError, batch_hash_function
+from .chain import (CHARSET, hash_function, charset_bytes, reduction_salt, extend_digest,
+                    password_at, check_position)
+from .keyspace import keyspace_for, start_point
+from .parallel import iter_batches, generate_batch
+from .stats import LookupStats
+from .vectorized import candidate_endpoints, match_endpoints
+
+CHAIN_ID_DTYPE = np.dtype("<u8")
+
+def endpoint_dtype(digest_size):
+    return np.dtype(f"S{digest_size}")
+
+def sort_chains(endpoints, chain_ids):
+    """Order chains by endpoint, then by chain id"""
+    order = np.lexsort((chain_ids, endpoints))
+    return endpoints[order], chain_ids[order]
+
+def unique_endpoints(endpoints):
+    """Mask of the first chain of every endpoint run in sorted endpoints"""
+    first = np.ones(len(endpoints), dtype=bool)
+    first[1:] = endpoints[1:] != endpoints[:-1]
+    return first
+
+def merge_stats(generated, unique, kept):
+    """Generation summary; merged chains are those ending at an already seen endpoint"""
+    return {
+        "generated": generated,
+        "unique_endpoints": unique,
+        "merged": generated - unique,
+        "merge_rate": (generated - unique) / generated if generated else 0.0,
+        "kept": kept,
+    }
+
+class ChainLookup:
+    """Lookup and verification shared by in-memory and on-disk tables
+
+    A table is two aligned arrays sorted by endpoint: the raw endpoint digests and the
+    uint64 chain ids. The start password of a chain is derived from (seed, chain id),
+    so nothing else is stored. Subclasses set the parameters through _init_params and
+    provide the arrays. Hex digests and str passwords only appear in the arguments and
+    results of the public methods.
+    """
+
+    def _init_params(self, pwd_len, chain_len, algo, charset, table_index, seed, min_pwd_len=None):
+        self.pwd_len = pwd_len
+        self.min_pwd_len = pwd_len if min_pwd_len is None else min_pwd_len
+        self.chain_len = chain_len
+        self.algo = algo
+        self.charset = charset
+        self.table_index = table_index
+        self.seed = seed
+        self._hash_fn = hash_function(algo)
+        self._keyspace = keyspace_for(charset_bytes(charset), pwd_len, self.min_pwd_len)
+        self._salt = reduction_salt(table_index)
+        self._batch_fn = batch_hash_function(algo, pwd_len, self.min_pwd_len)
+
+    @property
+    def digest_size(self):
+        return self._hash_fn().digest_size
+
+    def __len__(self):
+        return len(self.chain_ids)
+
+    @property
+    def nbytes(self):
+        """Memory taken by the chain arrays"""
+        return self.endpoints.nbytes + self.chain_ids.nbytes
+
+    @property
+    def total_hashes(self):
+        """Number of hashes computed to build the table"""
+        return len(self) * self.chain_len
+
+    def coverage(self):
+        """Estimated keyspace coverage in percent"""
+        total_possible = self._keyspace.size
+        return min(100, (self.total_hashes / total_possible) * 100)
+
+    def random_password(self, rng=random):
+        """Draw a random password from the table keyspace"""
+        return self._keyspace.password(rng.randrange(self._keyspace.size)).decode()
+
+    def start_point(self, chain_id):
+        """Start password bytes of a chain"""
+        return start_point(self.seed, int(chain_id), self._keyspace)
+
+    def chain_ids_for(self, end):
+        """Ids of every chain ending at the endpoint digest end"""
+        key = np.array(end, dtype=self.endpoints.dtype)
+        lo = np.searchsorted(self.endpoints, key, side="left")
+        hi = np.searchsorted(self.endpoints, key, side="right")
+        return self.chain_ids[lo:hi]
+
+    def _content_arrays(self):
+        return self.endpoints, self.chain_ids
+
+    def identity(self):
+        """Hex digest of the table parameters and chains
+
+        Tables with the same identity answer every lookup the same way; regenerating or
+        appending to a table changes it. Computed once per set of chain arrays.
+        """
+        arrays = self._content_arrays()
+        cached = getattr(self, "_identity", None)
+        if cached is not None and all(a is b for a, b in zip(cached[0], arrays)):
+            return cached[1]
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((type(self).__name__, self.algo, self.pwd_len, self.min_pwd_len,
+                       self.chain_len, self.charset, self.table_index, self.seed)).encode())
+        for array in arrays:
+            h.update(np.ascontiguousarray(array))
+        self._identity = (arrays, h.hexdigest())
+        return self._identity[1]
+
+    def next_chain_id(self):
+        """First chain id above every chain in the table, where appended chains start"""
+        return int(self.chain_ids.max()) + 1 if len(self) else 0
+
+    def password_at(self, start_pwd, position):
+        """Return the password at a position of the chain starting at start_pwd"""
+        if isinstance(start_pwd, str):
+            start_pwd = start_pwd.encode()
+        return password_at(start_pwd, position, self._hash_fn, self._keyspace, self._salt).decode()
+
+    def hash(self, password):
+        return self._hash_fn(password.encode()).hexdigest()
+
+    def verify(self, password, target_hash):
+        """Check that password really hashes to target_hash"""
+        return password is not None and self.hash(password) == target_hash.lower()
+
+    def check_algorithm(self, algo):
+        """Refuse hashes of another algorithm; algo None means the table's own"""
+        if algo is not None and algo != self.algo:
+            raise AlgorithmMismatchError(f"table is built for {self.algo}, not {algo}")
+
+    def target_digest(self, target_hash, algo=None):
+        """Raw digest of a hex target hash, refusing hashes of another algorithm
+
+        algo, when given, names the algorithm the hash came from and must be the table's.
+        """
+        self.check_algorithm(algo)
+        target = bytes.fromhex(target_hash)
+        if len(target) != self.digest_size:
+            raise AlgorithmMismatchError(
+                f"{self.algo} hashes have {self.digest_size} bytes, got {len(target)}")
+        return target
+
+    def endpoint_for(self, target, pos):
+        """Extend a target digest from chain position pos to the chain endpoint"""
+        return extend_digest(target, pos, self.chain_len, self._hash_fn, self._keyspace, self._salt)
+
+    def verify_at(self, chain_id, position, target, stats=None):
+        """Check whether chain chain_id holds the target digest at position
+
+        Reconstruction stops at the matched position. Returns the password, or None for
+        a false alarm; both outcomes are counted in stats when given.
+        """
+        pwd = check_position(self.start_point(chain_id), position, target,
+                             self._hash_fn, self._keyspace, self._salt)
+        if stats is not None:
+            stats.add_verification(position + 1, pwd is not None)
+            if pwd is not None:
+                stats.position = position
+        return pwd.decode() if pwd is not None else None
+
+    def _search_endpoint(self, end, target, position, stats):
+        for chain_id in self.chain_ids_for(end):
+            pwd = self.verify_at(chain_id, position, target, stats)
+            if pwd is not None:
+                return pwd
+        return None
+
+    def crack(self, target_hash, progress=None, lockstep=True, stats=None, algo=None, cache=None):
+        """Attempt to crack a hex hash using the table
+
+        The default lockstep mode computes the candidate endpoint of every chain position
+        in one vectorized pass and joins them against the table at once; lockstep=False
+        probes one position at a time from the end of the chain.
+        progress, when given, is called with every chain step or position as it is tried.
+        stats, a LookupStats, collects candidate, verification and false-alarm counts.
+        algo, when given, is checked against the table algorithm (see target_digest).
+        cache, a ResultCache, answers repeated lookups and remembers new results.
+        Returns (password, success).
+        """
+        if stats is None:
+            stats = LookupStats()
+        if cache is not None:
+            self.target_digest(target_hash, algo)
+            return cache.crack(self, target_hash, lambda: self.crack(
+                target_hash, progress, lockstep, stats, algo), stats)
+        if lockstep:
+            return self.crack_lockstep(target_hash, progress, stats, algo)
+        target = self.target_digest(target_hash, algo)
+        # Try to find the hash in the table endpoints
+        pwd = self._search_endpoint(target, target, self.chain_len, stats)
+        if pwd is not None:
+            return pwd, True
+
+        # Not found as endpoint - try intermediate positions
+        for pos in range(self.chain_len - 1, -1, -1):
+            if progress:
+                progress(pos)
+            stats.candidate_hashes += self.chain_len - pos
+            pwd = self._search_endpoint(self.endpoint_for(target, pos), target, pos, stats)
+            if pwd is not None:
+                return pwd, True
+
+        return None, False
+
+    def crack_lockstep(self, target_hash, progress=None, stats=None, algo=None):
+        """Crack a hex hash from all candidate endpoints at once"""
+        if stats is None:
+            stats = LookupStats()
+        target = self.target_digest(target_hash, algo)
+        candidates = candidate_endpoints(target, self.chain_len, self._hash_fn, self._keyspace,
+                                         progress, self._batch_fn, self._salt)
+        stats.candidate_hashes += self.chain_len * (self.chain_len + 1) // 2
+        matched, lo, hi = match_endpoints(self.endpoints, candidates)
+        # Same order as the positional search: endpoint first, then backwards
+        for pos, first, last in reversed(list(zip(matched, lo, hi))):
+            for chain_id in self.chain_ids[first:last]:
+                pwd = self.verify_at(chain_id, int(pos), target, stats)
+                if pwd is not None:
+                    return pwd, True
+        return None, False
+
+class RainbowTable(ChainLookup):
+    """In-memory rainbow table
+
+    Passwords have pwd_len characters, or min_pwd_len..pwd_len when min_pwd_len is given.
+    """
+
+    def __init__(self, pwd_len=8, chain_len=1000, algo="md5", charset=CHARSET, table_index=0,
+                 min_pwd_len=None):
+        self._init_params(pwd_len, chain_len, algo, charset, table_index, None, min_pwd_len)
+        self.generation_stats = {}
+        self.perfect = False
+        self.clear()
+
+    def clear(self):
+        self.endpoints = np.empty(0, dtype=endpoint_dtype(self.digest_size))
+        self.chain_ids = np.empty(0, dtype=CHAIN_ID_DTYPE)
+
+    def set_chains(self, endpoints, chain_ids):
+        """Replace the table contents, sorting the chains by endpoint"""
+        self.endpoints, self.chain_ids = sort_chains(
+            np.asarray(endpoints, dtype=endpoint_dtype(self.digest_size)),
+            np.asarray(chain_ids, dtype=CHAIN_ID_DTYPE))
+
+    def generate_range(self, first, stop, workers=1, batch_size=4096, report=None):
+        """Endpoints of chain ids [first, stop) for the table seed, in id order
+
+        report, when given, is called with the number of chains in every finished batch.
+        """
+        blobs = []
+        args = (self.seed, self.chain_len, self.algo, self.pwd_len, self.charset, self.table_index,
+                self.min_pwd_len)
+        for _, ends in iter_batches(generate_batch, first, stop, args,
+                                    workers=workers, batch_size=batch_size):
+            blobs.append(ends)
+            if report:
+                report(len(ends) // self.digest_size)
+        return np.frombuffer(b"".join(blobs), dtype=endpoint_dtype(self.digest_size))
+
+    def generate(self, num_chains, progress=None, seed=None, workers=1, batch_size=4096,
+                 perfect=False, max_oversample=4.0):
+        """Generate chains for a seed
+
+        Chain i always starts from the same password for a given seed, so the table is
+        identical whatever the worker count. workers=None uses every core.
+        With perfect=False the table holds chains 0..num_chains-1. With perfect=True only
+        the lowest-id chain of every endpoint is kept and more chain ids are generated
+        until num_chains unique endpoints exist, or max_oversample * num_chains chains
+        have been tried.
+        progress, when given, is called as progress(done, num_chains) after every batch.
+        generation_stats afterwards reports the merge rate.
+        """
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.perfect = perfect
+        done = 0
+
+        def report(count):
+            nonlocal done
+            done += count
+            if progress:
+                progress(min(done, num_chains), num_chains)
+
+        endpoints = self.generate_range(0, num_chains, workers, batch_size, report)
+        chain_ids = np.arange(num_chains, dtype=CHAIN_ID_DTYPE)
+        endpoints, chain_ids = sort_chains(endpoints, chain_ids)
+        if not perfect:
+            self.endpoints, self.chain_ids = endpoints, chain_ids
+            unique = int(np.count_nonzero(unique_endpoints(endpoints)))
+            self.generation_stats = merge_stats(num_chains, unique, num_chains)
+            return self
+
+        limit = int(num_chains * max_oversample)
+        generated = num_chains
+        first = unique_endpoints(endpoints)
+        endpoints, chain_ids = endpoints[first], chain_ids[first]
+        while len(endpoints) < num_chains and generated < limit:
+            # Oversample by the missing count scaled up by the merge rate seen so far
+            missing = num_chains - len(endpoints)
+            extra = min(limit - generated, max(missing * generated // max(len(endpoints), 1), 1))
+            more = self.generate_range(generated, generated + extra, workers, batch_size, report)
+            endpoints, chain_ids = sort_chains(
+                np.concatenate([endpoints, more]),
+                np.concatenate([chain_ids, np.arange(generated, generated + extra, dtype=CHAIN_ID_DTYPE)]))
+            first = unique_endpoints(endpoints)
+            endpoints, chain_ids = endpoints[first], chain_ids[first]
+            generated += extra
+
+        unique = len(endpoints)
+        if unique > num_chains:
+            # Keep the num_chains lowest chain ids so the table only depends on the seed
+            keep = chain_ids < np.sort(chain_ids)[num_chains]
+            endpoints, chain_ids = endpoints[keep], chain_ids[keep]
+        self.endpoints, self.chain_ids = endpoints, chain_ids
+        self.generation_stats = merge_stats(generated, unique, len(endpoints))
+        return self
+
+    def append(self, num_chains, progress=None, workers=1, batch_size=4096):
+        """Grow a generated table by num_chains chains without regenerating the others
+
+        The new chains take the next untried chain ids under the same seed and are merged
+        into the sorted arrays. A plain table then equals one generated at the larger
+        size. A perfect table stays perfect: ids after every id generate already tried
+        are used, and new chains ending at an endpoint the table holds are dropped, so
+        fewer than num_chains chains may be added.
+        """
+        if self.seed is None:
+            raise ValueError("only a generated table can be appended to")
+        first = self.next_chain_id()
+        if self.perfect:
+            first = max(first, self.generation_stats.get("generated", first))
+        done = 0
+
+        def report(count):
+            nonlocal done
+            done += count
+            if progress:
+                progress(done, num_chains)
+
+        before = len(self)
+        endpoints = self.generate_range(first, first + num_chains, workers, batch_size, report)
+        self.endpoints, self.chain_ids = sort_chains(
+            np.concatenate([self.endpoints, endpoints]),
+            np.concatenate([self.chain_ids,
+                            np.arange(first, first + num_chains, dtype=CHAIN_ID_DTYPE)]))
+        generated = first + num_chains
+        if self.perfect:
+            # Existing chains have lower ids, so they win every endpoint they share
+            keep = unique_endpoints(self.endpoints)
+            self.endpoints, self.chain_ids = self.endpoints[keep], self.chain_ids[keep]
+            unique = self.generation_stats.get("unique_endpoints", before) + len(self) - before
+        else:
+            unique = int(np.count_nonzero(unique_endpoints(self.endpoints)))
+        self.generation_stats = merge_stats(generated, unique, len(self))
+        return self
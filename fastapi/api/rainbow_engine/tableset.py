@@ -0,0 +1,146 @@
+"""
+Rainbow Table Engine - Table Sets
+Concurrent lookup across several tables over the same keyspace
+
+Tables with different table indices use different reduction families, so each one
+covers the keyspace independently and their success rates compound. A TableSet
+searches all of its tables at once and stops the others at the first verified hit.
+Table files are searched in a process pool whose workers map every file once;
+in-memory tables are searched in a thread pool.
+"""
+
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+
+from .parallel import default_workers
+from .stats import LookupStats
+from .storage import MappedTable, load_table
+
+class SearchCancelled(Exception):
+    """Raised inside a table search once another table has found the password"""
+
+def _search(table, target_hash, cancel, algo=None):
+    stats = LookupStats()
+
+    def progress(_):
+        if cancel.is_set():
+            raise SearchCancelled
+
+    try:
+        pwd, found = table.crack(target_hash, progress=progress, stats=stats, algo=algo)
+    except SearchCancelled:
+        pwd, found = None, False
+    return pwd, found, stats
+
+# Per-process state of the table file workers
+_worker_tables = {}
+_worker_cancel = None
+
+def _init_worker(cancel):
+    global _worker_cancel
+    _worker_cancel = cancel
+
+def _search_file(path, target_hash, algo=None):
+    table = _worker_tables.get(path)
+    if table is None:
+        table = _worker_tables[path] = load_table(path)
+    return _search(table, target_hash, _worker_cancel, algo)
+
+class TableSet:
+    """Several tables for one keyspace, usually built with different table indices"""
+
+    def __init__(self, tables, workers=None):
+        self.tables = list(tables)
+        if not self.tables:
+            raise ValueError("a table set needs at least one table")
+        first = self.tables[0]
+        for table in self.tables[1:]:
+            if ((table.algo, table.pwd_len, table.min_pwd_len, table.charset)
+                    != (first.algo, first.pwd_len, first.min_pwd_len, first.charset)):
+                raise ValueError("tables in a set must share algorithm, password lengths and charset")
+        self.workers = min(workers or default_workers(), len(self.tables))
+        self._files = all(isinstance(table, MappedTable) for table in self.tables)
+        self._cancel = multiprocessing.Event() if self._files else threading.Event()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def __len__(self):
+        return len(self.tables)
+
+    @property
+    def algo(self):
+        return self.tables[0].algo
+
+    def identity(self):
+        """Hex digest of the member table identities, whatever their order"""
+        h = hashlib.blake2b(digest_size=16)
+        for table_id in sorted(table.identity() for table in self.tables):
+            h.update(bytes.fromhex(table_id))
+        return h.hexdigest()
+
+    def coverage(self):
+        """Estimated keyspace coverage in percent, treating the tables as independent"""
+        miss = 1.0
+        for table in self.tables:
+            miss *= 1 - table.coverage() / 100
+        return (1 - miss) * 100
+
+    def _pool(self):
+        if self._executor is None:
+            if self._files:
+                self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                     initargs=(self._cancel,))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers)
+        return self._executor
+
+    def crack(self, target_hash, stats=None, algo=None, cache=None):
+        """Search every table for a hex hash at once
+
+        Returns (password, success) from the first table whose hit verifies; the other
+        searches are stopped. stats, a LookupStats, collects the work of all tables.
+        algo, when given, must be the algorithm of the tables. cache, a ResultCache,
+        answers repeated lookups; a miss is remembered for the whole set.
+        """
+        if stats is None:
+            stats = LookupStats()
+        # Refuse a wrong algorithm or hash length before starting any search
+        self.tables[0].target_digest(target_hash, algo)
+        if cache is not None:
+            return cache.crack(self, target_hash,
+                               lambda: self.crack(target_hash, stats, algo), stats)
+        with self._lock:
+            self._cancel.clear()
+            pool = self._pool()
+            if self._files:
+                futures = [pool.submit(_search_file, table.path, target_hash, algo)
+                           for table in self.tables]
+            else:
+                futures = [pool.submit(_search, table, target_hash, self._cancel, algo)
+                           for table in self.tables]
+            password = None
+            try:
+                for future in as_completed(futures):
+                    pwd, found, table_stats = future.result()
+                    stats.merge(table_stats)
+                    if found and password is None:
+                        password = pwd
+                        self._cancel.set()
+            finally:
+                # Never leave a search running into the next lookup
+                self._cancel.set()
+                wait(futures)
+        return password, password is not None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
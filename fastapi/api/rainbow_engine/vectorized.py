@@ -0,0 +1,167 @@
+"""
+Rainbow Table Engine - Vectorized Chain Steps
+Batched reduction over numpy arrays and lockstep computation of crack candidates
+
+Digests and passwords are handled as 2-D uint8 arrays, one row per chain or per
+candidate position, so a reduction step for every row is a handful of numpy calls.
+Password rows are max_len wide; a variable-length keyspace adds a lengths array.
+"""
+
+import logging
+from functools import lru_cache
+
+import numpy as np
+
+from .chain import reduce_digest
+
+logger = logging.getLogger(__name__)
+
+LIMB_MASK = np.uint64(0xFFFFFFFF)
+
+def reduce_digests(digests, step, keyspace, salt=0):
+    """Reduce every digest row at the same chain step into keyspace passwords
+
+    Returns (rows, lengths) as Keyspace.password_rows does. Bit-identical to
+    reduce_digest: the rare rows where the first 64 digest bits plus step overflow
+    uint64 are redone with the scalar reduction. A fixed-length keyspace too large for
+    uint64 indices is decoded from 32-bit limbs of the drawn digest bytes instead; only
+    a variable-length one that large is reduced row by row, which is much slower.
+    """
+    if not keyspace.fits_uint64:
+        if keyspace.fixed:
+            limbs = draw_limbs(digests, step, keyspace.draw_width(digests.shape[1]), salt)
+            return keyspace.limb_password_rows(limbs), None
+        _log_scalar_reduction(keyspace)
+        return keyspace.pack([reduce_digest(digests[row].tobytes(), step, keyspace, salt)
+                              for row in range(len(digests))])
+    x = np.ascontiguousarray(digests[:, :8]).view(">u8").ravel().astype(np.uint64)
+    if salt:
+        x ^= np.uint64(salt)
+    num = x + np.uint64(step)
+    overflow = num < x
+    rows, lengths = keyspace.password_rows(num)
+    for row in np.flatnonzero(overflow):
+        pwd = reduce_digest(digests[row].tobytes(), step, keyspace, salt)
+        rows[row, :len(pwd)] = np.frombuffer(pwd, dtype=np.uint8)
+        if lengths is not None:
+            lengths[row] = len(pwd)
+    return rows, lengths
+
+def draw_limbs(digests, step, width, salt=0):
+    """The reduction input (digest[:width] ^ salt) + step of every row, as 32-bit limbs
+
+    Returns an (N, width // 4 + 1) uint64 array, most significant limb first; the
+    extra leading limb takes the carry out of the addition. salt and step must be
+    below 2^64 and 2^32.
+    """
+    words = np.ascontiguousarray(digests[:, :width]).view(">u4")
+    limbs = np.zeros((len(digests), words.shape[1] + 1), dtype=np.uint64)
+    limbs[:, 1:] = words
+    limbs[:, -1] ^= np.uint64(salt & 0xFFFFFFFF)
+    limbs[:, -2] ^= np.uint64(salt >> 32)
+    carry = np.uint64(step)
+    for i in range(limbs.shape[1] - 1, -1, -1):
+        total = limbs[:, i] + carry
+        limbs[:, i] = total & LIMB_MASK
+        carry = total >> np.uint64(32)
+    return limbs
+
+@lru_cache(maxsize=None)
+def _log_scalar_reduction(keyspace):
+    logger.warning("keyspace of %d to %d characters over %d symbols is too large for "
+                   "vectorized reduction; reducing row by row", keyspace.min_len,
+                   keyspace.max_len, keyspace.base)
+
+# Below this many rows the per-call numpy overhead of a batch kernel outweighs hashlib
+MIN_KERNEL_ROWS = 2048
+
+def hash_rows(rows, hash_fn, batch_fn=None, lengths=None):
+    """Hash every password row, returning the digests as rows
+
+    batch_fn, a kernel from batch_hash, is used instead of hashlib for large batches.
+    With lengths, each row is hashed over its own length, one group per length.
+    """
+    if lengths is not None:
+        digests = np.empty((len(rows), hash_fn().digest_size), dtype=np.uint8)
+        for length in np.unique(lengths):
+            group = np.flatnonzero(lengths == length)
+            digests[group] = hash_rows(rows[group, :length], hash_fn, batch_fn)
+        return digests
+    if batch_fn is not None and len(rows) >= MIN_KERNEL_ROWS:
+        return batch_fn(rows)
+    width = rows.shape[1]
+    data = memoryview(rows.tobytes())
+    digests = b"".join([hash_fn(data[i:i + width]).digest()
+                        for i in range(0, len(data), width)])
+    return np.frombuffer(digests, dtype=np.uint8).reshape(len(rows), -1)
+
+def chain_endpoints(rows, lengths, chain_len, hash_fn, keyspace, batch_fn=None, salt=0):
+    """Walk every start password row through a full chain in lockstep"""
+    for step in range(chain_len):
+        rows, lengths = reduce_digests(hash_rows(rows, hash_fn, batch_fn, lengths), step,
+                                       keyspace, salt)
+    return hash_rows(rows, hash_fn, batch_fn, lengths)
+
+def candidate_endpoints(target, chain_len, hash_fn, keyspace, progress=None, batch_fn=None,
+                        salt=0):
+    """Endpoints of every chain position the target digest could sit at
+
+    Row p is the endpoint reached if the target is the hash at chain position p, for
+    p in 0..chain_len (row chain_len is the target itself). All positions advance
+    together: at step s, positions 0..s share the same reduction step and are reduced
+    and hashed as one batch.
+    progress, when given, is called with every step as it is computed.
+    """
+    targets = np.frombuffer(target, dtype=np.uint8)[np.newaxis]
+    return batch_candidate_endpoints(targets, chain_len, hash_fn, keyspace, progress,
+                                     batch_fn, salt)[:, 0]
+
+def batch_candidate_endpoints(targets, chain_len, hash_fn, keyspace, progress=None,
+                              batch_fn=None, salt=0):
+    """candidate_endpoints of many target digests at once
+
+    targets is a (T, digest_size) uint8 array; the result has shape
+    (chain_len + 1, T, digest_size) with [p, t] the endpoint of target t at position p.
+    Every step reduces and hashes the active positions of all targets as one batch.
+    """
+    ends = np.tile(targets, (chain_len + 1, 1, 1))
+    for step in range(chain_len):
+        if progress:
+            progress(step)
+        active = ends[:step + 1].reshape(-1, targets.shape[1])
+        rows, lengths = reduce_digests(active, step, keyspace, salt)
+        active[:] = hash_rows(rows, hash_fn, batch_fn, lengths)
+    return ends
+
+def match_endpoints(endpoints, candidates):
+    """Join candidate endpoint rows against a sorted endpoint column
+
+    Returns (candidate row indices that matched, lo, hi) where the table rows lo..hi of
+    each match hold the chains ending at that candidate.
+    """
+    keys = np.ascontiguousarray(candidates).view(endpoints.dtype).ravel()
+    lo = np.searchsorted(endpoints, keys, side="left")
+    hi = np.searchsorted(endpoints, keys, side="right")
+    matched = np.flatnonzero(hi > lo)
+    return matched, lo[matched], hi[matched]
+
+def merge_join_endpoints(endpoints, candidates):
+    """match_endpoints for a large candidate set, in one ordered pass over the table
+
+    The candidates are sorted and deduplicated first, so the table is searched with
+    increasing keys: each search starts where the previous one ended and a memory-mapped
+    table is read front to back, once. Results are in candidate order.
+    """
+    keys = np.ascontiguousarray(candidates).view(endpoints.dtype).ravel()
+    order = np.argsort(keys, kind="stable")
+    ordered = keys[order]
+    first = np.ones(len(ordered), dtype=bool)
+    first[1:] = ordered[1:] != ordered[:-1]
+    distinct = ordered[first]
+    lo = np.searchsorted(endpoints, distinct, side="left")
+    hi = np.searchsorted(endpoints, distinct, side="right")
+    group = np.cumsum(first) - 1
+    hit = hi[group] > lo[group]
+    rows = order[hit]
+    resort = np.argsort(rows)
+    return rows[resort], lo[group[hit]][resort], hi[group[hit]][resort]
@@ -0,0 +1,118 @@
+"""
+Rainbow Table Engine - Batch Worker
+Long-lived lookup process answering batches of hashes over stdin/stdout
+Usage: python -m rainbow_engine.worker
+
+The protocol is one JSON object per line. The worker first writes
+    {"ready": true, "backend": "cpu", "protocol": 1, "pid": ...}
+then answers every request line
+    {"id": 7, "table": "/path/to/table.rbt", "hashes": ["5f4d...", ...], "algo": "md5"}
+with one response line
+    {"id": 7, "results": [{"hash": ..., "password": ..., "found": ...}, ...],
+     "timings": {"load_ms": ..., "lookup_ms": ..., "total_ms": ..., "hashes_per_second": ...},
+     "stats": {...}, "backend": "cpu"}
+or, when the request cannot be answered, {"id": 7, "error": "...", "invalid": true}.
+invalid is true for bad requests (unknown algorithm, malformed hash, unreadable
+table) and false when the worker itself failed. Tables stay mapped between requests
+and are reopened when their file changes, so only the first batch against a table
+pays for loading it. Any other engine, such as a GPU one, can serve the API by
+speaking the same protocol.
+"""
+
+import json
+import os
+import sys
+import time
+
+from .batch_crack import crack_batch
+from .stats import LookupStats
+from .storage import load_table
+
+PROTOCOL_VERSION = 1
+
+BACKEND = "cpu"
+
+class TableCache:
+    """Tables opened by a worker, by path, reopened when the file changes"""
+
+    def __init__(self):
+        self.tables = {}
+
+    def get(self, path):
+        """(table, seconds spent loading it, 0 when it was already open)"""
+        st = os.stat(path)
+        key = (st.st_size, st.st_mtime_ns)
+        cached = self.tables.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1], 0.0
+        if cached is not None:
+            self.tables.pop(path)[1].close()
+        start = time.perf_counter()
+        table = load_table(path)
+        self.tables[path] = (key, table)
+        return table, time.perf_counter() - start
+
+    def close(self):
+        for _, table in self.tables.values():
+            table.close()
+        self.tables.clear()
+
+def crack_request(tables, request):
+    """Response to one request of the protocol"""
+    start = time.perf_counter()
+    table, load_seconds = tables.get(request["table"])
+    hashes = request["hashes"]
+    algo = request.get("algo")
+    stats = LookupStats()
+    lookup_start = time.perf_counter()
+    results = [(target_hash, password)
+               for target_hash, password, _ in crack_batch(table, hashes, stats, algo)]
+    end = time.perf_counter()
+    lookup_seconds = end - lookup_start
+    return {
+        "id": request.get("id"),
+        "results": [{"hash": h, "password": p, "found": p is not None} for h, p in results],
+        "timings": {
+            "load_ms": load_seconds * 1000,
+            "lookup_ms": lookup_seconds * 1000,
+            "total_ms": (end - start) * 1000,
+            "hashes_per_second": len(results) / lookup_seconds if lookup_seconds > 0 else 0.0,
+        },
+        "stats": stats.to_dict(),
+        "backend": BACKEND,
+    }
+
+def serve(requests, out):
+    """Answer request lines from requests, writing response lines to out"""
+    tables = TableCache()
+    out.write(json.dumps({"ready": True, "backend": BACKEND, "protocol": PROTOCOL_VERSION,
+                          "pid": os.getpid()}) + "\n")
+    out.flush()
+    try:
+        for line in requests:
+            if not line.strip():
+                continue
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request.get("id")
+                response = crack_request(tables, request)
+            except (KeyError, TypeError, ValueError, OSError) as e:
+                # A bad request or an unreadable table; the worker carries on
+                response = {"id": request_id, "error": str(e), "invalid": True}
+            except Exception as e:
+                response = {"id": request_id, "error": f"{type(e).__name__}: {e}",
+                            "invalid": False}
+            out.write(json.dumps(response) + "\n")
+            out.flush()
+    finally:
+        tables.close()
+
+def main():
+    # Keep stdout for the protocol; anything else printed goes to stderr
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    serve(sys.stdin, out)
+
+if __name__ == "__main__":
+    main()
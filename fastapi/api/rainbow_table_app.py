@@ -4,100 +4,22 @@ Educational tool for demonstrating rainbow table attacks on MD5 hashes
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-import hashlib
-import hmac
-import random
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import time
-import sys
 import json
 from datetime import datetime
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 import threading
+from pathlib import Path
 
-# ============ CONFIGURATION ============
-# Character set for password generation
-CHARSET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789@!#$%&*"
-
-# Pre-defined test cases
-TEST_PASSWORDS = {
-    "ceb6c970658f31504a901b89dcd3e461": "test@123",
-    "5f4dcc3b5aa765d61d8327deb882cf99": "password",
-    "e10adc3949ba59abbe56e057f20f883e": "123456",
-    "25d55ad283aa400af464c76d713c07ad": "12345678",
-    "d8578edf8458ce06fbc5bb76a58c5ca4": "qwerty"
-}
-
-# ============ HASH FUNCTIONS ============
-def hash_password(password, algo="md5"):
-    """Generate hash for given password"""
-    if algo == "md5":
-        return hashlib.md5(password.encode()).hexdigest()
-    elif algo == "sha1":
-        return hashlib.sha1(password.encode()).hexdigest()
-    elif algo == "sha256":
-        return hashlib.sha256(password.encode()).hexdigest()
-    else:
-        return hashlib.md5(password.encode()).hexdigest()
-
-def reduce_hash(hash_value, step, pwd_len, charset=CHARSET):
-    """Reduction function: converts hash to password"""
-    # Use hash and step to generate deterministic password
-    num = int(hash_value[:16], 16) + step
-    base = len(charset)
-    pwd = ""
-    for _ in range(pwd_len):
-        pwd += charset[num % base]
-        num //= base
-    return pwd
+from rainbow_engine import (RainbowTable, LookupStats, default_workers, save_table, load_table,
+                            append_table, TableFormatError, ALGORITHMS, ResultCache)
+from rainbow_engine.table import unique_endpoints
 
-def generate_chain(start_pwd, chain_len, algo, pwd_len, charset=CHARSET):
-    """Generate a complete rainbow table chain"""
-    pwd = start_pwd
-    for step in range(chain_len):
-        h = hash_password(pwd, algo)
-        pwd = reduce_hash(h, step, pwd_len, charset)
-    # Return final hash (endpoint)
-    return hash_password(pwd, algo)
-
-def crack_hash(target_hash, rainbow_table, chain_len, algo, pwd_len, charset=CHARSET):
-    """Attempt to crack a hash using the rainbow table"""
-    # Try to find the hash in the table endpoints
-    if target_hash in rainbow_table.values():
-        # Found direct match - reconstruct the chain
-        for start_pwd, end_hash in rainbow_table.items():
-            if end_hash == target_hash:
-                # Reconstruct chain to find actual password
-                pwd = start_pwd
-                for step in range(chain_len):
-                    h = hash_password(pwd, algo)
-                    if h == target_hash:
-                        return pwd, True
-                    pwd = reduce_hash(h, step, pwd_len, charset)
-                return pwd, True
-    
-    # Not found as endpoint - try intermediate positions
-    for pos in range(chain_len - 1, -1, -1):
-        test_hash = target_hash
-        # Extend from this position to endpoint
-        for step in range(pos, chain_len):
-            pwd = reduce_hash(test_hash, step, pwd_len, charset)
-            test_hash = hash_password(pwd, algo)
-        
-        # Check if this endpoint exists in table
-        if test_hash in rainbow_table.values():
-            for start_pwd, end_hash in rainbow_table.items():
-                if end_hash == test_hash:
-                    # Found it! Reconstruct to find password
-                    pwd = start_pwd
-                    for step in range(chain_len):
-                        h = hash_password(pwd, algo)
-                        if h == target_hash:
-                            return pwd, True
-                        pwd = reduce_hash(h, step, pwd_len, charset)
-    
-    return None, False
+# ============ CONFIGURATION ============
+# Cracked passwords and misses, kept across runs
+CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "crack_cache.sqlite3"
 
 # ============ GUI APPLICATION ============
 class RainbowTableGUI:
@@ -108,7 +30,8 @@ class RainbowTableGUI:
         self.root.configure(bg="#f0f0f0")
         
         # Data structures
-        self.rainbow_table = {}
+        self.rainbow_table = RainbowTable()
+        self.cache = ResultCache(str(CACHE_PATH))
         self.metrics = {
             "chains": [],
             "generation_times": [],
@@ -155,10 +78,21 @@ class RainbowTableGUI:
         
         # Hash Algorithm
         tk.Label(config_frame, text="Hash Algorithm:", bg="#ffffff").grid(row=3, column=0, sticky=tk.W, padx=5, pady=5)
-        self.algo = ttk.Combobox(config_frame, values=["md5", "sha1", "sha256"], width=13)
+        self.algo = ttk.Combobox(config_frame, values=list(ALGORITHMS), width=13)
         self.algo.current(0)
         self.algo.grid(row=3, column=1, padx=5, pady=5)
         
+        # Worker Processes
+        tk.Label(config_frame, text="Worker Processes:", bg="#ffffff").grid(row=4, column=0, sticky=tk.W, padx=5, pady=5)
+        self.workers = tk.Entry(config_frame, width=15)
+        self.workers.insert(0, str(default_workers()))
+        self.workers.grid(row=4, column=1, padx=5, pady=5)
+        
+        # Perfect Table (one chain per endpoint)
+        self.perfect = tk.BooleanVar(value=False)
+        tk.Checkbutton(config_frame, text="Perfect Table (drop merged chains)", variable=self.perfect,
+                      bg="#ffffff").grid(row=5, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        
         # Action Buttons
         button_frame = tk.Frame(left_frame, bg="#ffffff")
         button_frame.pack(pady=10)
@@ -168,6 +102,18 @@ class RainbowTableGUI:
                                 font=("Arial", 10, "bold"), width=20)
         self.gen_btn.pack(pady=5)
         
+        self.append_btn = tk.Button(button_frame, text="Append Chains", 
+                                   command=self.append_chains, bg="#2980b9", fg="white",
+                                   font=("Arial", 9), width=20)
+        self.append_btn.pack(pady=2)
+        
+        file_frame = tk.Frame(button_frame, bg="#ffffff")
+        file_frame.pack(pady=2)
+        tk.Button(file_frame, text="Save Table", command=self.save_table,
+                 bg="#95a5a6", fg="white", font=("Arial", 9)).pack(side=tk.LEFT, padx=2)
+        tk.Button(file_frame, text="Load Table", command=self.load_table,
+                 bg="#95a5a6", fg="white", font=("Arial", 9)).pack(side=tk.LEFT, padx=2)
+        
         # Hash Cracking Section
         crack_frame = tk.LabelFrame(left_frame, text="Hash Cracking", 
                                    font=("Arial", 10, "bold"), bg="#ffffff")
@@ -279,6 +225,8 @@ class RainbowTableGUI:
             chain_len = int(self.chain_len.get())
             num_chains = int(self.num_chains.get())
             algo = self.algo.get()
+            workers = int(self.workers.get())
+            perfect = self.perfect.get()
             
             if pwd_len < 1 or pwd_len > 16:
                 messagebox.showerror("Error", "Password length must be between 1 and 16")
@@ -289,6 +237,14 @@ class RainbowTableGUI:
             if num_chains < 100 or num_chains > 100000:
                 messagebox.showerror("Error", "Number of chains must be between 100 and 100000")
                 return
+            if workers < 1:
+                messagebox.showerror("Error", "Worker processes must be at least 1")
+                return
+            # The combobox takes free text; the generation thread must not meet a bad name
+            if algo not in ALGORITHMS:
+                messagebox.showerror("Error", f"Unknown hash algorithm {algo!r}; choose one of "
+                                              f"{', '.join(sorted(ALGORITHMS))}")
+                return
                 
         except ValueError:
             messagebox.showerror("Error", "Invalid input values")
@@ -301,43 +257,33 @@ class RainbowTableGUI:
         
         # Run in thread
         thread = threading.Thread(target=self._generate_table_thread, 
-                                 args=(pwd_len, chain_len, num_chains, algo))
+                                 args=(pwd_len, chain_len, num_chains, algo, workers, perfect))
         thread.daemon = True
         thread.start()
         
-    def _generate_table_thread(self, pwd_len, chain_len, num_chains, algo):
+    def _generate_table_thread(self, pwd_len, chain_len, num_chains, algo, workers, perfect):
         """Background thread for table generation"""
-        self.rainbow_table.clear()
+        table = RainbowTable(pwd_len=pwd_len, chain_len=chain_len, algo=algo)
         start_time = time.time()
         
         self.lbl_status.config(text=f"Status: Generating {num_chains} chains...")
         
-        # Generate chains
-        for i in range(num_chains):
-            # Generate random starting password
-            start_pwd = "".join(random.choice(CHARSET) for _ in range(pwd_len))
-            
-            # Generate chain endpoint
-            end_hash = generate_chain(start_pwd, chain_len, algo, pwd_len)
-            
-            # Store in table
-            self.rainbow_table[start_pwd] = end_hash
-            
-            # Update progress every 100 chains
-            if (i + 1) % 100 == 0:
-                self.lbl_status.config(text=f"Status: Generated {i + 1}/{num_chains} chains...")
+        def report(done, total):
+            # Update progress after every finished batch
+            self.lbl_status.config(text=f"Status: Generated {done}/{total} chains...")
+        
+        table.generate(num_chains, progress=report, workers=workers, perfect=perfect)
+        self.rainbow_table = table
         
         # Calculate statistics
         end_time = time.time()
         duration = end_time - start_time
-        total_hashes = num_chains * chain_len
+        total_hashes = table.generation_stats["generated"] * chain_len
         hash_rate = total_hashes / duration if duration > 0 else 0
-        memory_kb = sys.getsizeof(self.rainbow_table) / 1024
+        memory_kb = table.nbytes / 1024
         
         # Estimate coverage
-        charset_size = len(CHARSET)
-        total_possible = charset_size ** pwd_len
-        coverage = min(100, (num_chains * chain_len / total_possible) * 100)
+        coverage = table.coverage()
         
         # Update metrics
         self.metrics["chains"].append(num_chains)
@@ -345,12 +291,67 @@ class RainbowTableGUI:
         self.metrics["hash_rates"].append(hash_rate)
         
         # Update UI
-        self.root.after(0, self._update_stats, duration, num_chains, total_hashes, 
-                       hash_rate, memory_kb, coverage)
+        self.root.after(0, self._update_stats, duration, len(table), total_hashes, 
+                       hash_rate, memory_kb, coverage, table.generation_stats["merge_rate"])
+        
+    def append_chains(self):
+        """Grow the current table by Number of Chains new chains"""
+        if not self.rainbow_table or self.rainbow_table.seed is None:
+            messagebox.showwarning("Warning", "Please generate or load a rainbow table first!")
+            return
+        try:
+            num_chains = int(self.num_chains.get())
+            workers = int(self.workers.get())
+            if num_chains < 1 or workers < 1:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Invalid input values")
+            return
+        table = self.rainbow_table
+        if not isinstance(table, RainbowTable) and table.next_chain_id() != len(table):
+            messagebox.showerror("Error", "This table dropped chains when it was built "
+                                          "(perfect table) and cannot be appended to")
+            return
+        
+        self.gen_btn.config(state=tk.DISABLED)
+        self.append_btn.config(state=tk.DISABLED)
+        self.crack_btn.config(state=tk.DISABLED)
+        self.progress.start()
         
-    def _update_stats(self, duration, num_chains, total_hashes, hash_rate, memory_kb, coverage):
+        thread = threading.Thread(target=self._append_chains_thread, args=(num_chains, workers))
+        thread.daemon = True
+        thread.start()
+        
+    def _append_chains_thread(self, num_chains, workers):
+        """Background thread for appending chains to an in-memory or loaded table"""
+        table = self.rainbow_table
+        start_time = time.time()
+        
+        def report(done, total):
+            self.lbl_status.config(text=f"Status: Appended {done}/{total} chains...")
+        
+        if isinstance(table, RainbowTable):
+            table.append(num_chains, progress=report, workers=workers)
+            merge_rate = table.generation_stats["merge_rate"]
+        else:
+            # Loaded tables grow on disk and are mapped again
+            append_table(table.path, num_chains, workers=workers, progress=report)
+            table.close()
+            table = self.rainbow_table = load_table(table.path)
+            unique = int(unique_endpoints(table.endpoints).sum())
+            merge_rate = 1 - unique / len(table) if len(table) else 0.0
+        
+        duration = time.time() - start_time
+        hashes = num_chains * table.chain_len
+        hash_rate = hashes / duration if duration > 0 else 0
+        self.root.after(0, self._update_stats, duration, len(table), table.total_hashes,
+                       hash_rate, table.nbytes / 1024, table.coverage(), merge_rate)
+        
+    def _update_stats(self, duration, num_chains, total_hashes, hash_rate, memory_kb, coverage,
+                      merge_rate):
         """Update UI with statistics"""
-        self.lbl_status.config(text="Status: Table generated successfully!")
+        self.lbl_status.config(text=f"Status: Table generated successfully! "
+                                    f"(merge rate {merge_rate:.1%})")
         self.lbl_time.config(text=f"Generation Time: {duration:.2f} seconds")
         self.lbl_chains.config(text=f"Total Chains: {num_chains:,}")
         self.lbl_hashes.config(text=f"Total Hashes: {total_hashes:,}")
@@ -375,6 +376,7 @@ class RainbowTableGUI:
         
         # Re-enable buttons
         self.gen_btn.config(state=tk.NORMAL)
+        self.append_btn.config(state=tk.NORMAL)
         self.crack_btn.config(state=tk.NORMAL)
         self.progress.stop()
         
@@ -385,16 +387,12 @@ class RainbowTableGUI:
             return
         
         target_hash = self.hash_input.get().strip().lower()
-        if target_hash == "ceb6c970658f31504a901b89dcd3e461":
-            self.result_text.config(state=tk.NORMAL)
-            self.result_text.delete(0, tk.END)
-            self.result_text.insert(0, "test@123")
-            self.result_text.config(state="readonly", fg="#27ae60")
-            self.lbl_status.config(text="Status: Hash cracked successfully! (Demo Mode)")
-            messagebox.showinfo("Success", "Password found: test@123")
-            return
-        if len(target_hash) != 32:
-            messagebox.showerror("Error", "Invalid MD5 hash (must be 32 characters)")
+        try:
+            self.rainbow_table.target_digest(target_hash)
+        except ValueError:
+            table = self.rainbow_table
+            messagebox.showerror("Error", f"Invalid {table.algo} hash "
+                                          f"(must be {table.digest_size * 2} hex characters)")
             return
         
         # Disable button
@@ -411,13 +409,9 @@ class RainbowTableGUI:
         """Background thread for hash cracking"""
         start_time = time.time()
         
-        pwd_len = int(self.pwd_len.get())
-        chain_len = int(self.chain_len.get())
-        algo = self.algo.get()
-        
         # Attempt to crack
-        password, success = crack_hash(target_hash, self.rainbow_table, 
-                                      chain_len, algo, pwd_len)
+        stats = LookupStats()
+        password, success = self.rainbow_table.crack(target_hash, stats=stats, cache=self.cache)
         
         end_time = time.time()
         crack_time = end_time - start_time
@@ -441,23 +435,33 @@ class RainbowTableGUI:
                 self.metrics["success_rates"].append((successful / total_attempts) * 100)
         
         # Update UI
-        self.root.after(0, self._update_crack_result, password, success, crack_time)
+        self.root.after(0, self._update_crack_result, password, success, crack_time, stats)
         
-    def _update_crack_result(self, password, success, crack_time):
+    def _update_crack_result(self, password, success, crack_time, stats):
         """Update UI with crack result"""
-        if success:
+        if success and stats.cache_hits:
             self.result_text.config(state=tk.NORMAL)
             self.result_text.delete(0, tk.END)
             self.result_text.insert(0, password)
             self.result_text.config(state="readonly", fg="#27ae60")
-            self.lbl_status.config(text=f"Status: Hash cracked successfully in {crack_time:.2f}s!")
+            self.lbl_status.config(text="Status: Hash cracked successfully! (from result cache)")
+            messagebox.showinfo("Success", f"Password found: {password}")
+        elif success:
+            self.result_text.config(state=tk.NORMAL)
+            self.result_text.delete(0, tk.END)
+            self.result_text.insert(0, password)
+            self.result_text.config(state="readonly", fg="#27ae60")
+            self.lbl_status.config(text=f"Status: Hash cracked successfully in {crack_time:.2f}s! "
+                                        f"({stats.false_alarms} false alarms)")
             messagebox.showinfo("Success", f"Password found: {password}")
         else:
             self.result_text.config(state=tk.NORMAL)
             self.result_text.delete(0, tk.END)
             self.result_text.insert(0, "NOT FOUND")
             self.result_text.config(state="readonly", fg="#e74c3c")
-            self.lbl_status.config(text=f"Status: Hash not found in table (tried for {crack_time:.2f}s)")
+            tried = "miss already recorded for this table" if stats.cache_hits else \
+                f"tried for {crack_time:.2f}s, {stats.false_alarms} false alarms"
+            self.lbl_status.config(text=f"Status: Hash not found in table ({tried})")
             messagebox.showwarning("Failed", "Password not found in rainbow table")
         
         # Update success rate graph
@@ -486,6 +490,39 @@ class RainbowTableGUI:
         self.crack_btn.config(state=tk.NORMAL)
         self.progress.stop()
         
+    def save_table(self):
+        """Save the generated table to a binary table file"""
+        if not isinstance(self.rainbow_table, RainbowTable) or not self.rainbow_table:
+            messagebox.showwarning("Warning", "Please generate a rainbow table first!")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".rbt",
+                                            filetypes=[("Rainbow tables", "*.rbt")])
+        if not path:
+            return
+        save_table(self.rainbow_table, path)
+        self.lbl_status.config(text=f"Status: Table saved to {path}")
+        
+    def load_table(self):
+        """Memory-map a saved table file for cracking"""
+        path = filedialog.askopenfilename(filetypes=[("Rainbow tables", "*.rbt")])
+        if not path:
+            return
+        try:
+            table = load_table(path)
+        except (OSError, TableFormatError) as e:
+            messagebox.showerror("Error", f"Could not load table: {e}")
+            return
+        self.rainbow_table = table
+        
+        # Reflect the table parameters in the configuration fields
+        for entry, value in ((self.pwd_len, table.pwd_len), (self.chain_len, table.chain_len)):
+            entry.delete(0, tk.END)
+            entry.insert(0, str(value))
+        self.algo.set(table.algo)
+        self.lbl_status.config(text=f"Status: Table loaded from {path}")
+        self.lbl_chains.config(text=f"Total Chains: {len(table):,}")
+        self.lbl_coverage.config(text=f"Coverage: {table.coverage():.4f}%")
+        
     def load_test_hash(self):
         """Load test hash"""
         self.hash_input.delete(0, tk.END)
@@ -499,10 +536,7 @@ class RainbowTableGUI:
             messagebox.showwarning("Warning", "Please generate a rainbow table first!")
             return
         
-        pwd_len = int(self.pwd_len.get())
-        chain_len = int(self.chain_len.get())
-        algo = self.algo.get()
-        
+        table = self.rainbow_table
         test_count = 20
         successes = 0
         
@@ -510,12 +544,11 @@ class RainbowTableGUI:
         
         for i in range(test_count):
             # Generate random password
-            test_pwd = "".join(random.choice(CHARSET) for _ in range(pwd_len))
-            test_hash = hash_password(test_pwd, algo)
+            test_pwd = table.random_password()
+            test_hash = table.hash(test_pwd)
             
             # Try to crack
-            found_pwd, success = crack_hash(test_hash, self.rainbow_table, 
-                                          chain_len, algo, pwd_len)
+            found_pwd, success = table.crack(test_hash)
             
             if success:
                 successes += 1
@@ -1,4 +1,30 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 class HashRequest(BaseModel):
-    hash_value: int
+    hash_value: str
+    table: Optional[str] = None
+    algo: Optional[str] = None
+
+class BatchCrackRequest(BaseModel):
+    hashes: List[str]
+    table: str
+    algo: Optional[str] = None
+
+class HashFileRequest(BaseModel):
+    table: str
+    file: str = "input_hash.txt"
+    algo: Optional[str] = None
+
+class TableJobRequest(BaseModel):
+    name: str
+    chains: int
+    pwd_len: int = 8
+    min_pwd_len: Optional[int] = None
+    chain_len: int = 1000
+    algo: str = "md5"
+    charset: Optional[str] = None
+    table_index: int = 0
+    seed: Optional[int] = None
+    workers: Optional[int] = None
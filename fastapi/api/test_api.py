@@ -0,0 +1,276 @@
+"""
+API Test Script - Streaming endpoints under a real ASGI exchange
+Runs the app with the messages an ASGI 2.3 server such as uvicorn sends, including
+client disconnects. Run directly or with pytest.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import main
+import utils
+from processes import ProcessLimiter
+from rainbow_engine import (LookupStats, RainbowTable, ResultCache, hash_password, load_table,
+                            save_table)
+from rainbow_engine.ingest import MAX_LINE_BYTES, HashListReader
+
+os.chdir(main.current_dir)
+
+JSON_HEADERS = [(b"content-type", b"application/json")]
+
+async def asgi_request(app, method, path, body_chunks=(), query=b"", disconnect_on=None,
+                       headers=()):
+    """Run one request through app; returns (status, body)
+
+    disconnect_on="start" makes the client go away once the response has started,
+    disconnect_on="body" once the first body chunk has arrived.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query,
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), *headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": bytes(chunk), "more_body": True}
+                for chunk in body_chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+    gone = asyncio.Event()
+    status = None
+    body = bytearray()
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            if disconnect_on == "start":
+                gone.set()
+        elif message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+            if disconnect_on == "body" and body:
+                gone.set()
+            if not message.get("more_body"):
+                gone.set()
+
+    await asyncio.wait_for(app(scope, receive, send), 60)
+    return status, bytes(body)
+
+async def settle(limiter):
+    """Wait for cancelled streams to finish their cleanup"""
+    for _ in range(100):
+        if not limiter.running and not limiter.waiting:
+            return
+        await asyncio.sleep(0.05)
+
+def test_disconnect_frees_slot():
+    async def run():
+        main.PROCESSES = limiter = ProcessLimiter(max_running=1, max_waiting=0)
+        status, body = await asgi_request(main.app, "GET", "/test", disconnect_on="body")
+        assert status == 200 and body
+        await settle(limiter)
+        assert limiter.metrics()["running"] == 0, limiter.metrics()
+        assert limiter.killed == 1
+        # The slot is free again: the next request is served, not turned away
+        status, _ = await asgi_request(main.app, "GET", "/test", disconnect_on="body")
+        assert status == 200
+        await settle(limiter)
+    asyncio.run(run())
+
+def test_queue_cap():
+    async def run():
+        main.PROCESSES = limiter = ProcessLimiter(max_running=1, max_waiting=2)
+        statuses = [status for status, _ in await asyncio.gather(
+            *(asgi_request(main.app, "GET", "/test", disconnect_on="start") for _ in range(6)))]
+        assert sorted(statuses) == [200, 200, 200, 503, 503, 503], statuses
+        await settle(limiter)
+        assert limiter.running == 0 and limiter.waiting == 0, limiter.metrics()
+    asyncio.run(run())
+
+def test_upload():
+    table = RainbowTable(pwd_len=4, chain_len=50).generate(200, seed=7)
+    password = table.password_at(table.start_point(table.chain_ids[3]), 20)
+    hashes = [hash_password(password), "0" * 32, hash_password(password), "not a hash"]
+    body = ("\n".join(hashes) + "\n").encode()
+    with tempfile.TemporaryDirectory() as tmp:
+        save_table(table, str(Path(tmp) / "upload.rbt"))
+        main.TABLES_DIR = Path(tmp)
+        main.RESULT_CACHE = ResultCache()
+        # Split mid-line, as a chunked upload may be
+        chunks = [body[:10], body[10:45], body[45:]]
+        status, response = asyncio.run(asgi_request(main.app, "POST", "/crack/upload",
+                                                    chunks, query=b"table=upload.rbt"))
+    assert status == 200, response
+    lines = [json.loads(line) for line in response.splitlines()]
+    results = {line["hash"]: line["password"] for line in lines if "hash" in line}
+    assert results == {hash_password(password): password, "0" * 32: None}, results
+    summary = lines[-1]
+    assert summary["done"] and summary["cracked"] == 1, summary
+    assert summary["duplicates"] == 1 and summary["invalid"] == 1, summary
+
+def test_crack_coalesces():
+    # Identical concurrent lookups run one search; the others await its result
+    table = RainbowTable(pwd_len=4, chain_len=1000).generate(200, seed=7)
+    password = table.password_at(table.start_point(table.chain_ids[5]), 10)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "coalesce.rbt"
+        save_table(table, str(path))
+        main.LOADED_TABLES.clear()
+        main.LOADED_TABLES[path.name] = load_table(str(path))
+        main.TABLES_READY.set()
+        main.RESULT_CACHE = cache = ResultCache()
+
+        async def crack(target_hash):
+            body = json.dumps({"hash_value": target_hash}).encode()
+            status, response = await asgi_request(main.app, "POST", "/crack", [body],
+                                                  headers=JSON_HEADERS)
+            assert status == 200, response
+            return json.loads(response)
+
+        async def run():
+            return await asyncio.gather(*(crack(hash_password(password)) for _ in range(4)))
+        results = asyncio.run(run())
+        assert all(r["password"] == password for r in results), results
+        assert cache.metrics()["searches"] == 1 and cache.metrics()["coalesced"] == 3, \
+            cache.metrics()
+        assert sum(r["stats"]["coalesced"] for r in results) == 3, results
+        assert len(cache.inflight) == 0
+        # Answered from the cache from now on
+        again = asyncio.run(crack(hash_password(password)))
+        assert again["password"] == password and again["stats"]["cache_hits"] == 1, again
+        main.LOADED_TABLES.pop(path.name).close()
+
+def test_engine_cache():
+    # The engine only sees hashes that are neither cached nor being searched already
+    table = RainbowTable(pwd_len=4, chain_len=50).generate(200, seed=7)
+    password = table.password_at(table.start_point(table.chain_ids[3]), 20)
+    hashes = [hash_password(password), "0" * 32]
+    with tempfile.TemporaryDirectory() as tmp:
+        save_table(table, str(Path(tmp) / "engine.rbt"))
+        main.TABLES_DIR = Path(tmp)
+        main.RESULT_CACHE = cache = ResultCache()
+        body = json.dumps({"hashes": hashes, "table": "engine.rbt"}).encode()
+        responses = []
+        for _ in range(2):
+            status, response = asyncio.run(asgi_request(main.app, "POST", "/crack/engine", [body],
+                                                        headers=JSON_HEADERS))
+            assert status == 200, response
+            responses.append(json.loads(response))
+        requests = utils.engine_pool().metrics()["requests"]
+        utils.close_engine_pool()
+    first, second = responses
+    results = {r["hash"]: r["password"] for r in first["results"]}
+    assert results == {hashes[0]: password, hashes[1]: None}, first
+    assert {r["hash"]: r["password"] for r in second["results"]} == results, second
+    assert second["backend"] == "cache" and second["stats"]["cache_hits"] == 2, second
+    assert requests == 1
+
+    # A batch arriving while another searches its hashes waits for that search
+    started, release = threading.Event(), threading.Event()
+    searched = []
+
+    def search(target_hashes):
+        searched.append(target_hashes)
+        started.set()
+        release.wait(10)
+        return {hashes[0]: password}
+
+    cache = ResultCache()
+    leader = threading.Thread(target=cache.crack_many, args=("md5", "t", hashes[:1], search))
+    leader.start()
+    started.wait(10)
+    stats = LookupStats()
+    follower = threading.Thread(target=lambda: searched.append(
+        cache.crack_many("md5", "t", hashes, search, stats)))
+    follower.start()
+    while cache.inflight.coalesced == 0 and follower.is_alive():
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+    assert searched == [[hashes[0]], [hashes[1]], {hashes[0]: password, hashes[1]: None}], searched
+    assert stats.coalesced == 1, stats
+
+def test_crack_job_table():
+    # A table built through POST /tables is served by /crack without a restart
+    with tempfile.TemporaryDirectory() as tmp:
+        main.TABLES_DIR = Path(tmp)
+        main.LOADED_TABLES.clear()
+        main.TABLES_READY.set()
+        main.RESULT_CACHE = ResultCache()
+        body = json.dumps({"name": "job.rbt", "chains": 200, "pwd_len": 4, "chain_len": 50,
+                           "seed": 7, "workers": 1}).encode()
+        status, response = asyncio.run(asgi_request(main.app, "POST", "/tables", [body],
+                                                    headers=JSON_HEADERS))
+        assert status == 202, response
+        job = main.JOBS.get(json.loads(response)["id"])
+        for _ in range(200):
+            if job.status not in ("queued", "running") and "job.rbt" in main.LOADED_TABLES:
+                break
+            time.sleep(0.05)
+        assert job.status == "done", job.snapshot()
+        table = main.LOADED_TABLES["job.rbt"]
+        password = table.password_at(table.start_point(table.chain_ids[3]), 20)
+        body = json.dumps({"hash_value": hash_password(password), "table": "job.rbt"}).encode()
+        status, response = asyncio.run(asgi_request(main.app, "POST", "/crack", [body],
+                                                    headers=JSON_HEADERS))
+        main.LOADED_TABLES.pop("job.rbt").close()
+    assert status == 200, response
+    assert json.loads(response)["password"] == password, response
+
+def test_long_line_across_chunks():
+    # An over-long line spread over several chunks counts once as one invalid line
+    good = hash_password("abcd").encode()
+    reader = HashListReader(16)
+    chunks = [good + b"\n" + b"x" * 600] + [b"x" * MAX_LINE_BYTES] * 4 + [b"x\n" + good + b"\n"]
+    digests = [batch for chunk in chunks for batch in reader.feed(chunk)] + reader.close()
+    assert sum(len(batch) for batch in digests) == 1
+    assert (reader.lines, reader.invalid, reader.duplicates) == (3, 1, 1), \
+        (reader.lines, reader.invalid, reader.duplicates)
+
+def test_table_field_ranges():
+    # Values the table file header cannot hold are refused before any job starts
+    jobs = len(main.JOBS.jobs)
+    with tempfile.TemporaryDirectory() as tmp:
+        main.TABLES_DIR = Path(tmp)
+        for field, value in (("seed", -1), ("seed", 1 << 64), ("chain_len", 1 << 32),
+                             ("table_index", -1), ("workers", 0)):
+            body = json.dumps({"name": "range.rbt", "chains": 10, field: value}).encode()
+            status, response = asyncio.run(asgi_request(main.app, "POST", "/tables", [body],
+                                                        headers=JSON_HEADERS))
+            assert status == 400 and field.encode() in response, (field, status, response)
+        assert len(main.JOBS.jobs) == jobs, main.JOBS.jobs
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("API TEST - Streaming and lookup endpoints")
+    print("=" * 70)
+    failed = 0
+    for test in (test_disconnect_frees_slot, test_queue_cap, test_upload,
+                 test_crack_coalesces, test_engine_cache, test_crack_job_table,
+                 test_long_line_across_chunks, test_table_field_ranges):
+        try:
+            test()
+            print(f"  ✓ SUCCESS: {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ FAILED: {test.__name__}: {e}")
+    main.JOBS.shutdown()
+    raise SystemExit(1 if failed else 0)
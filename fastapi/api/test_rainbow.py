@@ -3,30 +3,13 @@ Simple Test Script - Verify Rainbow Table Hash Cracking
 Tests the specific hash: ceb6c970658f31504a901b89dcd3e461 -> test@123
 """
 
-import hashlib
-import random
-
-# Character set
-CHARSET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789@!#$%&*"
-
-def hash_password(password):
-    return hashlib.md5(password.encode()).hexdigest()
-
-def reduce_hash(hash_value, step, pwd_len):
-    num = int(hash_value[:16], 16) + step
-    base = len(CHARSET)
-    pwd = ""
-    for _ in range(pwd_len):
-        pwd += CHARSET[num % base]
-        num //= base
-    return pwd
-
-def generate_chain(start_pwd, chain_len, pwd_len):
-    pwd = start_pwd
-    for step in range(chain_len):
-        h = hash_password(pwd)
-        pwd = reduce_hash(h, step, pwd_len)
-    return hash_password(pwd)
+import os
+import tempfile
+import threading
+
+from rainbow_engine import (RainbowTable, DistinguishedPointTable, TableSet, LookupStats,
+                            hash_password, crack_batch, ResultCache, TableBuilder, BuildCancelled,
+                            merge_tables, save_table, load_table, TableFormatError)
 
 print("=" * 70)
 print("RAINBOW TABLE TEST - Verify Hash Cracking")
@@ -53,21 +36,15 @@ pwd_len = 8
 chain_len = 100
 num_chains = 100
 
-rainbow_table = {}
-for i in range(num_chains):
-    start_pwd = "".join(random.choice(CHARSET) for _ in range(pwd_len))
-    end_hash = generate_chain(start_pwd, chain_len, pwd_len)
-    rainbow_table[start_pwd] = end_hash
+rainbow_table = RainbowTable(pwd_len=pwd_len, chain_len=chain_len, algo="md5")
+rainbow_table.generate(num_chains)
 
 print(f"  Table generated: {len(rainbow_table)} chains")
 print()
 
 # Test with a password from the table
-test_start = list(rainbow_table.keys())[0]
-pwd = test_start
-for step in range(chain_len // 2):
-    h = hash_password(pwd)
-    pwd = reduce_hash(h, step, pwd_len)
+test_start = rainbow_table.start_point(rainbow_table.chain_ids[0])
+pwd = rainbow_table.password_at(test_start, chain_len // 2)
 
 test_hash_in_table = hash_password(pwd)
 
@@ -75,23 +52,10 @@ print("TEST CASE 1: Password in Table")
 print(f"  Test Hash: {test_hash_in_table}")
 print(f"  Expected Password: {pwd}")
 
-# Simple lookup
-found = False
-if test_hash_in_table in rainbow_table.values():
-    print("  ✓ Hash found in endpoints!")
-    found = True
-else:
-    # Try intermediate positions
-    for pos in range(chain_len - 1, -1, -1):
-        test = test_hash_in_table
-        for step in range(pos, chain_len):
-            p = reduce_hash(test, step, pwd_len)
-            test = hash_password(p)
-        
-        if test in rainbow_table.values():
-            print(f"  ✓ Hash found at intermediate position {pos}!")
-            found = True
-            break
+# Table lookup
+found_pwd, found = rainbow_table.crack(test_hash_in_table)
+if found:
+    print(f"  ✓ Hash cracked: {found_pwd}")
 
 if found:
     print("  Result: SUCCESS ✓")
@@ -99,6 +63,137 @@ else:
     print("  Result: FAILED ✗")
 
 print()
+
+# Same password through a distinguished-point table over the same keyspace
+print("TEST CASE 2: Distinguished-Point Table")
+dp_table = DistinguishedPointTable(pwd_len=pwd_len, min_len=20, max_len=400, dp_bits=6, algo="md5")
+dp_table.generate(num_chains)
+dp_start = dp_table.start_point(dp_table.chain_ids[0])
+dp_pwd = dp_table.password_at(dp_start, int(dp_table.lengths[0]) // 2)
+for table, test_hash_dp in ((rainbow_table, test_hash_in_table), (dp_table, hash_password(dp_pwd))):
+    stats = LookupStats()
+    found_pwd, found = table.crack(test_hash_dp, stats=stats)
+    print(f"  {type(table).__name__}: {'found ' + found_pwd if found else 'not found'}, "
+          f"{stats.total_hashes:,} lookup hashes, {table.nbytes:,} bytes stored")
+print(f"  DP merge rate: {dp_table.generation_stats['merge_rate']:.1%}")
+
+print()
+
+# A password from a table with another index is found by searching the set
+print("TEST CASE 3: Table Set (table indices 0-2)")
+tables = [rainbow_table] + [RainbowTable(pwd_len=pwd_len, chain_len=chain_len, algo="md5",
+                                         table_index=i).generate(num_chains) for i in (1, 2)]
+set_start = tables[2].start_point(tables[2].chain_ids[0])
+set_pwd = tables[2].password_at(set_start, chain_len // 2)
+with TableSet(tables) as table_set:
+    found_pwd, found = table_set.crack(hash_password(set_pwd))
+print(f"  Index 0 alone: {'found' if rainbow_table.crack(hash_password(set_pwd))[1] else 'not found'}")
+print(f"  Table set: {'found ' + found_pwd if found else 'not found'} "
+      f"(combined coverage {table_set.coverage():.2e}%)")
+print("  Result: SUCCESS ✓" if found_pwd == set_pwd else "  Result: FAILED ✗")
+
+print()
+
+# Several hashes, with a duplicate and a miss, through one merged join
+print("TEST CASE 4: Batch Lookup")
+batch = [test_hash_in_table, test_hash_in_table, expected_hash]
+results = {h: cracked for h, cracked, _ in crack_batch(rainbow_table, batch)}
+for h, cracked in results.items():
+    print(f"  {h}: {cracked if cracked is not None else 'not found'}")
+print("  Result: SUCCESS ✓" if results.get(test_hash_in_table) == pwd
+      and len(results) == 2 else "  Result: FAILED ✗")
+print()
+
+# A repeated lookup is answered by the result cache without any search
+print("TEST CASE 5: Result Cache")
+cache = ResultCache()
+rainbow_table.crack(test_hash_in_table, cache=cache)
+stats = LookupStats()
+cached_pwd, found = rainbow_table.crack(test_hash_in_table, stats=stats, cache=cache)
+print(f"  Repeat lookup: {cached_pwd}, {stats.total_hashes} hashes, {stats.cache_hits} cache hit")
+print("  Result: SUCCESS ✓" if found and cached_pwd == pwd and stats.cache_hits == 1
+      else "  Result: FAILED ✗")
+print()
+
+work_dir = tempfile.TemporaryDirectory()
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+# Results survive a restart through the cache file; a miss only holds for its table
+print("TEST CASE 6: Result Cache Persistence")
+cache_path = os.path.join(work_dir.name, "cache.sqlite3")
+with ResultCache(cache_path) as cache:
+    rainbow_table.crack(test_hash_in_table, cache=cache)
+    rainbow_table.crack("0" * 32, cache=cache)
+    first_misses = cache.misses
+with ResultCache(cache_path) as cache:
+    table_id = rainbow_table.identity()
+    hit = cache.get("md5", test_hash_in_table.upper(), "another table")
+    miss = cache.get("md5", "0" * 32, table_id)
+    unknown = cache.get("md5", "0" * 32, "another table")
+    print(f"  After reopening: {hit}, miss {miss}, other table {unknown}, "
+          f"{cache.hits} hits / {cache.misses} misses")
+print("  Result: SUCCESS ✓" if first_misses == 2 and hit == (pwd, True)
+      and miss == (None, False) and unknown is None and cache.hits == 2 and cache.misses == 1
+      else "  Result: FAILED ✗")
+print()
+
+# A build stopped after a checkpoint resumes to the very same file
+print("TEST CASE 7: Resumed Build")
+build_args = dict(pwd_len=5, chain_len=50, seed=11, batch_size=500, checkpoint_chains=1000)
+whole = os.path.join(work_dir.name, "whole.rbt")
+TableBuilder(whole, 5000, **build_args).build()
+resumed = os.path.join(work_dir.name, "resumed.rbt")
+stop = threading.Event()
+builder = TableBuilder(resumed, 5000, **build_args)
+try:
+    builder.build(progress=lambda done, total: done >= 2500 and stop.set(), cancel=stop)
+    stopped = False
+except BuildCancelled:
+    stopped = not os.path.exists(resumed) and os.path.isdir(builder.build_dir)
+TableBuilder(resumed, 5000, **build_args).build()
+same = read_bytes(whole) == read_bytes(resumed)
+print(f"  Stopped with a checkpoint: {stopped}, resumed file identical: {same}")
+print("  Result: SUCCESS ✓" if stopped and same else "  Result: FAILED ✗")
+print()
+
+# Tables of consecutive chain id ranges merge into the table built in one go
+print("TEST CASE 8: Table Merge")
+low = os.path.join(work_dir.name, "low.rbt")
+high = os.path.join(work_dir.name, "high.rbt")
+merged = os.path.join(work_dir.name, "merged.rbt")
+TableBuilder(low, 3000, **build_args).build()
+TableBuilder(high, 2000, first_chain=3000, **build_args).build()
+merge_stats = merge_tables([low, high], merged)
+twice = merge_tables([low, low], os.path.join(work_dir.name, "twice.rbt"))
+same = read_bytes(merged) == read_bytes(whole)
+print(f"  Merged {merge_stats}, identical to one build: {same}; same table twice: {twice}")
+print("  Result: SUCCESS ✓" if same and merge_stats["written"] == 5000
+      and twice["dropped"] == 3000 else "  Result: FAILED ✗")
+print()
+
+# Damaged files are refused with TableFormatError instead of being mapped
+print("TEST CASE 9: Corrupt Table Files")
+good = read_bytes(whole)
+corruptions = {"bad magic": b"XXXX" + good[4:],
+               "unknown version": good[:4] + b"\xff\xff" + good[6:],
+               "truncated header": good[:20],
+               "truncated chains": good[:-7]}
+refused = []
+for name, data in corruptions.items():
+    path = os.path.join(work_dir.name, name.replace(" ", "_") + ".rbt")
+    with open(path, "wb") as f:
+        f.write(data)
+    try:
+        load_table(path).close()
+    except TableFormatError as e:
+        refused.append(name)
+        print(f"  {name}: {e}")
+print("  Result: SUCCESS ✓" if len(refused) == len(corruptions) else "  Result: FAILED ✗")
+work_dir.cleanup()
+print()
 print("=" * 70)
 print("TEST COMPLETE")
 print()
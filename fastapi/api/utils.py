@@ -1,26 +1,92 @@
-import subprocess
-import re
 import os
+import threading
+import time
+from dataclasses import fields
+
+from engine_pool import EnginePool
+from rainbow_engine import LookupStats, load_table
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-def run_cuda_and_get_metrics(hash_value: str):
-    exe_path = os.path.join(
-        BASE_DIR,
-        "cuda_core",
-        "src",
-        "cuda_rainbow.exe"
-    )
+# Table looked up by run_cuda_and_get_metrics when none is given
+ENGINE_TABLE = os.environ.get("RAINBOW_ENGINE_TABLE",
+                              os.path.join(BASE_DIR, "data", "tables", "demo.rbt"))
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def engine_pool():
+    """The engine worker pool shared by the process, started on first use"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = EnginePool()
+        return _engine
+
+def close_engine_pool():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+            _engine = None
+
+def run_engine_batch(hashes, table=None, algo=None, cache=None):
+    """Crack a batch of hashes in a pooled engine worker; returns results and timings
 
-    result = subprocess.run(
-        [exe_path, hash_value],
-        capture_output=True,
-        text=True
-    )
+    With cache, a ResultCache, hashes it knows are answered from it and hashes another
+    lookup is already searching wait for that search (see ResultCache.crack_many).
+    Only the rest go to the engine and their results are remembered; stats then count
+    the cache hits and coalesced hashes as well, and timings cover the engine calls.
+    """
+    path = table or ENGINE_TABLE
+    if cache is None:
+        return engine_pool().crack(path, hashes, algo)
+    with load_table(path) as lookup:
+        # Refuse bad hashes here, as the engine would, before any lookup is claimed
+        for target_hash in hashes:
+            lookup.target_digest(target_hash.strip().lower(), algo)
+        table_algo, table_id = lookup.algo, lookup.identity()
+    responses = []
 
-    output = result.stdout
+    def search(target_hashes):
+        response = engine_pool().crack(path, target_hashes, algo)
+        responses.append(response)
+        return {result["hash"]: result["password"] for result in response["results"]}
 
-    time_match = re.search(r"CUDA_TIME_MS:(\d+\.?\d*)", output)
-    time_ms = float(time_match.group(1)) if time_match else 0.0
+    stats = LookupStats()
+    start = time.perf_counter()
+    passwords = cache.crack_many(table_algo, table_id, hashes, search, stats)
+    total_seconds = time.perf_counter() - start
+    # Other engines may report other counters; only LookupStats ones are added up
+    counters = {field.name for field in fields(LookupStats)}
+    for response in responses:
+        reported = response.get("stats", {})
+        stats.merge(LookupStats(**{name: reported[name] for name in counters & reported.keys()}))
+    return {
+        "results": [{"hash": h, "password": p, "found": p is not None}
+                    for h, p in passwords.items()],
+        "timings": {
+            "load_ms": sum(r["timings"]["load_ms"] for r in responses),
+            "lookup_ms": sum(r["timings"]["lookup_ms"] for r in responses),
+            "total_ms": total_seconds * 1000,
+            "hashes_per_second": len(passwords) / total_seconds if total_seconds > 0 else 0.0,
+        },
+        "stats": stats.to_dict(),
+        "backend": responses[0]["backend"] if responses else "cache",
+    }
 
-    return output, time_ms
+def run_cuda_and_get_metrics(hash_value: str, table=None, algo=None, cache=None):
+    """
+    Crack one hash through the engine pool
+    Returns (output, time_ms): a text report ending in the CUDA_TIME_MS line the
+    engine binary used to print, and the lookup time in milliseconds
+    """
+    response = run_engine_batch([hash_value], table, algo, cache)
+    time_ms = response["timings"]["lookup_ms"]
+    lines = []
+    for result in response["results"]:
+        password = result["password"] if result["found"] else "not found"
+        lines.append(f"{result['hash']}: {password}")
+    lines.append(f"BACKEND:{response['backend']}")
+    lines.append(f"CUDA_TIME_MS:{time_ms:.3f}")
+    return "\n".join(lines) + "\n", time_ms
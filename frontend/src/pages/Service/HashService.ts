@@ -105,3 +105,85 @@ export async function plotPerformance(timeMs: number = 2.5, onData: StreamCallba
     throw error;
   }
 }
+
+export interface TableJobRequest {
+  name: string;
+  chains: number;
+  pwd_len?: number;
+  min_pwd_len?: number;
+  chain_len?: number;
+  algo?: string;
+  charset?: string;
+  table_index?: number;
+  seed?: number;
+  workers?: number;
+}
+
+export interface JobStatus {
+  id: string;
+  table: string;
+  status: "queued" | "running" | "done" | "failed" | "cancelled" | "stopped";
+  error: string | null;
+  chains_done: number;
+  chains_total: number;
+  progress: number;
+  hashes_per_second: number;
+  eta_seconds: number | null;
+}
+
+/**
+ * Start a table generation job
+ * @param {TableJobRequest} request table name and generation parameters
+ * @returns {Promise<{ id: string }>} id of the new job
+ */
+export async function startTableJob(request: TableJobRequest): Promise<{ id: string }> {
+  const response = await fetch(`${API_BASE_URL}/tables`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(request),
+  });
+  const body = await response.json();
+  if (!response.ok) throw new Error(body.error ?? "Failed to start table job");
+  return body;
+}
+
+/**
+ * Get the status of a table generation job
+ * @param {string} jobId job id returned by startTableJob
+ * @returns {Promise<JobStatus>} latest progress snapshot
+ */
+export async function getJob(jobId: string): Promise<JobStatus> {
+  const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`);
+  if (!response.ok) throw new Error("Failed to get job");
+  return await response.json();
+}
+
+/**
+ * Cancel a table generation job
+ * @param {string} jobId job id returned by startTableJob
+ * @returns {Promise<JobStatus>} snapshot at cancellation
+ */
+export async function cancelJob(jobId: string): Promise<JobStatus> {
+  const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`, { method: "DELETE" });
+  if (!response.ok) throw new Error("Failed to cancel job");
+  return await response.json();
+}
+
+/**
+ * Follow the progress of a table generation job
+ * @param {string} jobId job id returned by startTableJob
+ * @param {(job: JobStatus) => void} onProgress called with every snapshot, the last one finished
+ * @returns {() => void} function closing the event stream
+ */
+export function streamJobEvents(jobId: string, onProgress: (job: JobStatus) => void): () => void {
+  const source = new EventSource(`${API_BASE_URL}/jobs/${jobId}/events`);
+  const handle = (event: MessageEvent) => onProgress(JSON.parse(event.data));
+  source.addEventListener("progress", handle);
+  for (const outcome of ["done", "failed", "cancelled", "stopped"]) {
+    source.addEventListener(outcome, (event) => {
+      handle(event as MessageEvent);
+      source.close();
+    });
+  }
+  return () => source.close();
+}